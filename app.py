@@ -1,19 +1,200 @@
+import time
+from datetime import datetime, timezone
 import streamlit as st
 import pandas as pd
+import utils
 from utils import (
     get_robots_summary,
     can_crawl,
-    is_javascript_heavy,
-    check_rss_feeds,
-    show_crawlability_report
+    analyze_urls,
+    crawlability_report,
+    show_crawlability_report,
+    get_session,
+    robots_cache,
 )
+from browser_pool import get_browser_pool
 from data_fetch import (
-    extract_all_products,
+    CATEGORY_URLS,
+    category_name,
+    crawl_catalog,
+    crawl_product_details,
+    iter_product_pages,
     extract_slider_images
 )
+from result_cache import TTLCache
+from jobs import JobManager
+from thumbnails import ThumbnailCache
+from prices import normalize_prices, price_histogram, price_outliers, price_stats
+from exports import PRODUCT_SCHEMA, SLIDER_SCHEMA, export_bytes, product_rows, slider_rows
+from metrics import HTTP_PHASES, metrics
 
 st.set_page_config(page_title="🕷️ Dream2000 Crawler", layout="wide")
 
+# Seconds each kind of result stays cached (shared by every session)
+CACHE_TTL = {
+    "robots": 3600,
+    "crawlability": 3600,
+    "products": 1800,
+    "catalog": 1800,
+    "details": 3600,
+    "slider": 1800,
+    "jobs": 3600,
+}
+
+
+@st.cache_resource
+def shared_results() -> TTLCache:
+    """Crawl results shared across all dashboard sessions in this process."""
+    return TTLCache()
+
+
+@st.cache_resource
+def shared_clients():
+    """Create the pooled HTTP session and browser pool once per process."""
+    return get_session(), get_browser_pool()
+
+
+@st.cache_resource
+def shared_jobs() -> JobManager:
+    """Background crawl jobs, shared by every session in this process."""
+    return JobManager()
+
+
+@st.cache_resource
+def shared_thumbnails() -> ThumbnailCache:
+    """Local thumbnail cache the product and slider grids are served from."""
+    return ThumbnailCache()
+
+
+results = shared_results()
+shared_clients()
+jobs = shared_jobs()
+thumbs = shared_thumbnails()
+
+if st.sidebar.button("🔄 Clear cached results"):
+    results.invalidate()
+    robots_cache.invalidate()
+    st.sidebar.success("Cache cleared.")
+
+def toggle_warc_archive():
+    if st.session_state["warc_archive"]:
+        utils.enable_warc_archive()
+    else:
+        utils.disable_warc_archive()
+
+
+# process-wide like the caches: only an actual click switches archiving on or off
+if "warc_archive" not in st.session_state:
+    st.session_state["warc_archive"] = utils.warc_archive is not None
+st.sidebar.toggle("Archive raw responses (WARC)", key="warc_archive", on_change=toggle_warc_archive)
+if utils.warc_archive is not None:
+    st.sidebar.caption(f"{utils.warc_archive.records} responses archived to {utils.warc_archive.directory}/")
+
+
+def product_list_page(title: str, default_url: str, button: str, noun: str):
+    """Category page: crawl a product listing and stream the grid as pages arrive."""
+    st.title(title)
+    base_url = st.text_input(
+        "Product list base URL",
+        value=default_url,
+    )
+    max_pages = st.number_input(
+        "Max pages to crawl", 1, 100, 10, 1
+    )
+    refresh = st.checkbox("Ignore cached results", value=False)
+    if st.button(f"{button} in background"):
+        if not can_crawl(base_url):
+            st.error("❌ Crawling disallowed by robots.txt.")
+        else:
+            job_id = jobs.submit_products(base_url, max_pages)
+            st.info(f"Started job `{job_id}`; follow it on the Background Jobs page.")
+    if st.button(button):
+        if not can_crawl(base_url):
+            st.error("❌ Crawling disallowed by robots.txt.")
+            return
+
+        key = ("products", base_url, max_pages)
+        if refresh:
+            results.invalidate(key)
+        status = st.empty()
+        grid = st.container()
+        per_row = 3
+
+        def show(items):
+            local = thumbs.get_many([p["image_url"] for p in items])
+            with grid:
+                for i in range(0, len(items), per_row):
+                    cols = st.columns(per_row)
+                    for col, prod in zip(cols, items[i : i + per_row]):
+                        with col:
+                            if prod["image_url"]:
+                                st.image(local.get(prod["image_url"]) or prod["image_url"], use_container_width=True)
+                            st.markdown(f"**[{prod['title']}]({prod['link']})**")
+                            st.markdown(f"*{prod['price']}*")
+
+        crawled = False
+
+        def crawl() -> list[dict]:
+            nonlocal crawled
+            crawled = True
+            products = []
+            progress = st.progress(0.0)
+            for page, new_items in iter_product_pages(base_url, max_pages, concurrency=4):
+                products.extend(new_items)
+                progress.progress(page / max_pages)
+                status.info(f"Page {page}: {len(products)} unique {noun} so far…")
+                show(new_items)
+            progress.empty()
+            return products
+
+        # one crawl per key: other sessions asking for it wait and reuse the result
+        products = results.get_or_compute(key, crawl, CACHE_TTL["products"])
+        if not crawled:
+            show(products)
+
+        if not products:
+            status.warning(f"No {noun} found.")
+        else:
+            status.success(f"Collected {len(products)} unique {noun}.")
+            df = pd.DataFrame(products)
+            st.download_button(
+                f"Download {noun} as CSV",
+                df.to_csv(index=False),
+                f"{noun}.csv",
+                "text/csv",
+            )
+            category = category_name(base_url)
+            typed_downloads(lambda: product_rows(products, category, cached_at(key)), noun, noun, key=noun)
+
+
+def cached_at(key) -> datetime | None:
+    """When the cached result under `key` was crawled, for the export timestamps."""
+    stored = results.stored_at(key)
+    return datetime.fromtimestamp(stored, timezone.utc) if stored is not None else None
+
+
+def typed_downloads(rows_fn, stem: str, noun: str, schema=PRODUCT_SCHEMA, key: str = ""):
+    """
+    JSONL and Parquet download buttons next to the CSV one (typed price,
+    currency, timestamp). Files are only serialized when a button is clicked.
+    """
+    cols = st.columns(2)
+    cols[0].download_button(
+        f"Download {noun} as JSONL",
+        lambda: export_bytes(rows_fn(), "jsonl", schema),
+        f"{stem}.jsonl",
+        "application/x-ndjson",
+        key=f"jsonl-{key}",
+    )
+    cols[1].download_button(
+        f"Download {noun} as Parquet",
+        lambda: export_bytes(rows_fn(), "parquet", schema),
+        f"{stem}.parquet",
+        "application/vnd.apache.parquet",
+        key=f"parquet-{key}",
+    )
+
+
 # Sidebar menu
 pages = [
     "Robots Summary",
@@ -29,15 +210,25 @@ pages = [
     "Extract conditioners",
     "Extract tvs",
     "Extract fitness",
+    "Extract All Categories",
+    "Background Jobs",
+    "Price Analytics",
+    "Product Details",
+    "Crawl Performance",
 
 ]
 choice = st.sidebar.selectbox("Navigation", pages)
 
 if choice == "Robots Summary":
     st.title("Summary of Crawlability Rules")
-    summary = get_robots_summary()
+    summary = results.get_or_compute(("robots",), get_robots_summary, CACHE_TTL["robots"])
     st.text(summary)
-    show_crawlability_report("https://dream2000.com/")
+    report = results.get_or_compute(
+        ("crawlability", "https://dream2000.com/"),
+        lambda: crawlability_report("https://dream2000.com/"),
+        CACHE_TTL["crawlability"],
+    )
+    show_crawlability_report("https://dream2000.com/", report)
     st.download_button(
         "Download robots.txt summary",
         summary,
@@ -57,366 +248,458 @@ elif choice == "Permission Checker":
 
 elif choice == "Site Analysis":
     st.title("Site Analysis Tools")
-    url = st.text_input("Enter URL to analyze", "https://dream2000.com/")
+    urls_text = st.text_area("Enter URLs to analyze (one per line)", "https://dream2000.com/")
     if st.button("Analyze"):
-        if is_javascript_heavy(url):
-            st.warning("⚠️ JS-heavy site detected.")
-        else:
-            st.success("✅ Static site.")
-        feeds = check_rss_feeds(url)
-        if feeds:
-            st.info("📡 Feeds / APIs found:")
-            for f in feeds:
-                st.write(f)
-        else:
-            st.info("ℹ️ No feeds/APIs detected.")
+        urls = [u.strip() for u in urls_text.splitlines() if u.strip()]
+        with st.spinner(f"Analyzing {len(urls)} URL(s)…"):
+            reports = analyze_urls(urls)
+        for url, report in reports.items():
+            if len(reports) > 1:
+                st.subheader(url)
+            if report["js_heavy"]:
+                st.warning("⚠️ JS-heavy site detected.")
+            else:
+                st.success("✅ Static site.")
+            if report["feeds"]:
+                st.info("📡 Feeds / APIs found:")
+                for f in report["feeds"]:
+                    st.write(f)
+            else:
+                st.info("ℹ️ No feeds/APIs detected.")
 
 elif choice == "Extract Mobiles":
-    st.title("📦 Preview Products from Mobile List")
-    base_url = st.text_input(
-        "Product list base URL",
-        value="https://dream2000.com/mobiles.html",
+    product_list_page(
+        "📦 Preview Products from Mobile List",
+        "https://dream2000.com/mobiles.html",
+        "Fetch & Preview Mobiles",
+        "products",
     )
-    max_pages = st.number_input(
-        "Max pages to crawl", 1, 100, 10, 1
-    )
-    if st.button("Fetch & Preview Mobiles"):
-        if not can_crawl(base_url):
-            st.error("❌ Crawling disallowed by robots.txt.")
-        else:
-            with st.spinner("Crawling pages…"):
-                products = extract_all_products(base_url, max_pages)
-            if not products:
-                st.warning("No products found.")
-            else:
-                st.success(f"Collected {len(products)} unique products.")
-                per_row = 3
-                for i in range(0, len(products), per_row):
-                    cols = st.columns(per_row)
-                    for col, prod in zip(cols, products[i : i + per_row]):
-                        with col:
-                            if prod["image_url"]:
-                                st.image(prod["image_url"], use_container_width=True)
-                            st.markdown(f"**[{prod['title']}]({prod['link']})**")
-                            st.markdown(f"*{prod['price']}*")
-                df = pd.DataFrame(products)
-                st.download_button(
-                    "Download products as CSV",
-                    df.to_csv(index=False),
-                    "products.csv",
-                    "text/csv",
-                )
 
 elif choice == "Extract Tablets":
-    st.title("📦 Preview Products from Tablet List")
-    base_url = st.text_input(
-        "Product list base URL",
-        value="https://dream2000.com/tablets.html",
+    product_list_page(
+        "📦 Preview Products from Tablet List",
+        "https://dream2000.com/tablets.html",
+        "Fetch & Preview Tablets",
+        "tablets",
     )
-    max_pages = st.number_input(
-        "Max pages to crawl", 1, 100, 10, 1
-    )
-    if st.button("Fetch & Preview Tablets"):
-        if not can_crawl(base_url):
-            st.error("❌ Crawling disallowed by robots.txt.")
-        else:
-            with st.spinner("Crawling pages…"):
-                products = extract_all_products(base_url, max_pages)
-            if not products:
-                st.warning("No tablets found.")
-            else:
-                st.success(f"Collected {len(products)} unique tablets.")
-                per_row = 3
-                for i in range(0, len(products), per_row):
-                    cols = st.columns(per_row)
-                    for col, prod in zip(cols, products[i : i + per_row]):
-                        with col:
-                            if prod["image_url"]:
-                                st.image(prod["image_url"], use_container_width=True)
-                            st.markdown(f"**[{prod['title']}]({prod['link']})**")
-                            st.markdown(f"*{prod['price']}*")
-                df = pd.DataFrame(products)
-                st.download_button(
-                    "Download tablets as CSV",
-                    df.to_csv(index=False),
-                    "tablets.csv",
-                    "text/csv",
-                )
 
 elif choice == "Extract Laptops":
-    st.title("📦 Preview Products from Laptop/Notebook List")
-    base_url = st.text_input(
-        "Product list base URL",
-        value="https://dream2000.com/laptop-notebook.html",
-    )
-    max_pages = st.number_input(
-        "Max pages to crawl", 1, 100, 10, 1
+    product_list_page(
+        "📦 Preview Products from Laptop/Notebook List",
+        "https://dream2000.com/laptop-notebook.html",
+        "Fetch & Preview Laptops",
+        "laptops",
     )
-    if st.button("Fetch & Preview Laptops"):
-        if not can_crawl(base_url):
-            st.error("❌ Crawling disallowed by robots.txt.")
-        else:
-            with st.spinner("Crawling pages…"):
-                products = extract_all_products(base_url, max_pages)
-            if not products:
-                st.warning("No laptops found.")
-            else:
-                st.success(f"Collected {len(products)} unique laptops.")
-                per_row = 3
-                for i in range(0, len(products), per_row):
-                    cols = st.columns(per_row)
-                    for col, prod in zip(cols, products[i : i + per_row]):
-                        with col:
-                            if prod["image_url"]:
-                                st.image(prod["image_url"], use_container_width=True)
-                            st.markdown(f"**[{prod['title']}]({prod['link']})**")
-                            st.markdown(f"*{prod['price']}*")
-                df = pd.DataFrame(products)
-                st.download_button(
-                    "Download laptops as CSV",
-                    df.to_csv(index=False),
-                    "laptops.csv",
-                    "text/csv",
-                )
 
 elif choice == "Extract accessories":
-    st.title("📦 Preview Products from Computer List")
-    base_url = st.text_input(
-        "Product list base URL",
-        value="https://dream2000.com/accessories.html",
-    )
-    max_pages = st.number_input(
-        "Max pages to crawl", 1, 100, 10, 1
+    product_list_page(
+        "📦 Preview Products from Computer List",
+        "https://dream2000.com/accessories.html",
+        "Fetch & Preview accessories",
+        "accessories",
     )
-    if st.button("Fetch & Preview accessories"):
-        if not can_crawl(base_url):
-            st.error("❌ Crawling disallowed by robots.txt.")
-        else:
-            with st.spinner("Crawling pages…"):
-                products = extract_all_products(base_url, max_pages)
-            if not products:
-                st.warning("No accessories found.")
-            else:
-                st.success(f"Collected {len(products)} unique accessories.")
-                per_row = 3
-                for i in range(0, len(products), per_row):
-                    cols = st.columns(per_row)
-                    for col, prod in zip(cols, products[i : i + per_row]):
-                        with col:
-                            if prod["image_url"]:
-                                st.image(prod["image_url"], use_container_width=True)
-                            st.markdown(f"**[{prod['title']}]({prod['link']})**")
-                            st.markdown(f"*{prod['price']}*")
-                df = pd.DataFrame(products)
-                st.download_button(
-                    "Download accessories as CSV",
-                    df.to_csv(index=False),
-                    "accessories.csv",
-                    "text/csv",
-                )
 elif choice == "Extract corporate":
-    st.title("📦 Preview Products from Computer List")
-    base_url = st.text_input(
-        "Product list base URL",
-        value="https://dream2000.com/corporate.html",
-    )
-    max_pages = st.number_input(
-        "Max pages to crawl", 1, 100, 10, 1
+    product_list_page(
+        "📦 Preview Products from Computer List",
+        "https://dream2000.com/corporate.html",
+        "Fetch & Preview corporate",
+        "corporate",
     )
-    if st.button("Fetch & Preview corporate"):
-        if not can_crawl(base_url):
-            st.error("❌ Crawling disallowed by robots.txt.")
-        else:
-            with st.spinner("Crawling pages…"):
-                products = extract_all_products(base_url, max_pages)
-            if not products:
-                st.warning("No corporate found.")
-            else:
-                st.success(f"Collected {len(products)} unique corporate.")
-                per_row = 3
-                for i in range(0, len(products), per_row):
-                    cols = st.columns(per_row)
-                    for col, prod in zip(cols, products[i : i + per_row]):
-                        with col:
-                            if prod["image_url"]:
-                                st.image(prod["image_url"], use_container_width=True)
-                            st.markdown(f"**[{prod['title']}]({prod['link']})**")
-                            st.markdown(f"*{prod['price']}*")
-                df = pd.DataFrame(products)
-                st.download_button(
-                    "Download corporate as CSV",
-                    df.to_csv(index=False),
-                    "corporate.csv",
-                    "text/csv",
-                )
 elif choice == "Extract appliances":
-    st.title("📦 Preview Products from Computer List")
-    base_url = st.text_input(
-        "Product list base URL",
-        value="https://dream2000.com/home-appliances.html",
+    product_list_page(
+        "📦 Preview Products from Computer List",
+        "https://dream2000.com/home-appliances.html",
+        "Fetch & Preview appliances",
+        "appliances",
     )
-    max_pages = st.number_input(
-        "Max pages to crawl", 1, 100, 10, 1
-    )
-    if st.button("Fetch & Preview appliances"):
-        if not can_crawl(base_url):
-            st.error("❌ Crawling disallowed by robots.txt.")
-        else:
-            with st.spinner("Crawling pages…"):
-                products = extract_all_products(base_url, max_pages)
-            if not products:
-                st.warning("No appliances found.")
-            else:
-                st.success(f"Collected {len(products)} unique appliances.")
-                per_row = 3
-                for i in range(0, len(products), per_row):
-                    cols = st.columns(per_row)
-                    for col, prod in zip(cols, products[i : i + per_row]):
-                        with col:
-                            if prod["image_url"]:
-                                st.image(prod["image_url"], use_container_width=True)
-                            st.markdown(f"**[{prod['title']}]({prod['link']})**")
-                            st.markdown(f"*{prod['price']}*")
-                df = pd.DataFrame(products)
-                st.download_button(
-                    "Download appliances as CSV",
-                    df.to_csv(index=False),
-                    "appliances.csv",
-                    "text/csv",
-                )
 elif choice == "Extract conditioners":
-    st.title("📦 Preview Products from Computer List")
-    base_url = st.text_input(
-        "Product list base URL",
-        value="https://dream2000.com/conditioners.html",
+    product_list_page(
+        "📦 Preview Products from Computer List",
+        "https://dream2000.com/conditioners.html",
+        "Fetch & Preview conditioners",
+        "conditioners",
+    )
+elif choice == "Extract tvs":
+    product_list_page(
+        "📦 Preview Products from Computer List",
+        "https://dream2000.com/tvs/brands.html",
+        "Fetch & Preview tvs",
+        "tvs",
+    )
+elif choice == "Extract fitness":
+    product_list_page(
+        "📦 Preview Products from Computer List",
+        "https://dream2000.com/fitness.html",
+        "Fetch & Preview fitness",
+        "fitness",
+    )
+elif choice == "Extract All Categories":
+    st.title("📦 Crawl the Whole Catalog")
+    selected = st.multiselect(
+        "Categories",
+        list(CATEGORY_URLS),
+        default=list(CATEGORY_URLS),
     )
     max_pages = st.number_input(
-        "Max pages to crawl", 1, 100, 10, 1
+        "Max pages to crawl per category", 1, 100, 10, 1
     )
-    if st.button("Fetch & Preview conditioners"):
-        if not can_crawl(base_url):
-            st.error("❌ Crawling disallowed by robots.txt.")
+    max_workers = st.number_input(
+        "Categories crawled in parallel", 1, 16, 4, 1
+    )
+    refresh = st.checkbox("Ignore cached results", value=False)
+    if st.button("Fetch All Categories"):
+        allowed = {
+            name: CATEGORY_URLS[name]
+            for name in selected
+            if can_crawl(CATEGORY_URLS[name])
+        }
+        skipped = sorted(set(selected) - set(allowed))
+        if skipped:
+            st.error(f"❌ Crawling disallowed by robots.txt for: {', '.join(skipped)}")
+        key = ("catalog", tuple(sorted(allowed)), max_pages)
+        if refresh:
+            results.invalidate(key)
+        with st.spinner("Crawling categories…"):
+            products = results.get_or_compute(
+                key,
+                lambda: crawl_catalog(allowed, max_pages, max_workers=max_workers),
+                CACHE_TTL["catalog"],
+            )
+        if not products:
+            st.warning("No products found.")
         else:
-            with st.spinner("Crawling pages…"):
-                products = extract_all_products(base_url, max_pages)
-            if not products:
-                st.warning("No conditioners found.")
-            else:
-                st.success(f"Collected {len(products)} unique conditioners.")
-                per_row = 3
-                for i in range(0, len(products), per_row):
-                    cols = st.columns(per_row)
-                    for col, prod in zip(cols, products[i : i + per_row]):
-                        with col:
-                            if prod["image_url"]:
-                                st.image(prod["image_url"], use_container_width=True)
-                            st.markdown(f"**[{prod['title']}]({prod['link']})**")
-                            st.markdown(f"*{prod['price']}*")
-                df = pd.DataFrame(products)
-                st.download_button(
-                    "Download conditioners as CSV",
-                    df.to_csv(index=False),
-                    "conditioners.csv",
-                    "text/csv",
-                )
-elif choice == "Extract tvs":
-    st.title("📦 Preview Products from Computer List")
-    base_url = st.text_input(
-        "Product list base URL",
-        value="https://dream2000.com/tvs/brands.html",
+            df = pd.DataFrame(products)
+            st.success(
+                f"Collected {len(products)} products across {df['category'].nunique()} categories."
+            )
+            st.dataframe(df.groupby("category").size().rename("products"))
+            st.download_button(
+                "Download all products as CSV",
+                df.to_csv(index=False),
+                "all_products.csv",
+                "text/csv",
+            )
+            typed_downloads(
+                lambda: product_rows(products, crawled_at=cached_at(key)),
+                "all_products", "all products", key="catalog",
+            )
+elif choice == "Background Jobs":
+    st.title("⏳ Background Crawl Jobs")
+
+    def job_result(job) -> tuple[list, pd.DataFrame]:
+        """A finished job's result and table, read from disk once per job run."""
+        def load():
+            result = jobs.result(job.id) or []
+            if job.kind == "products":
+                return result, pd.DataFrame(result)
+            return result, pd.DataFrame({"slider_image_url": result})
+
+        return results.get_or_compute(("job", job.id, job.finished_at), load, CACHE_TTL["jobs"])
+
+    # poll only while something can still change; finished jobs are static
+    active = any(j.status in ("queued", "running") for j in jobs.list_jobs())
+
+    @st.fragment(run_every=2 if active else None)
+    def job_table():
+        job_list = jobs.list_jobs()
+        if not job_list:
+            st.info("No jobs yet. Start one from a category or slider page.")
+            return
+        if active and not any(j.status in ("queued", "running") for j in job_list):
+            # the last job just finished: rerun the page to stop polling
+            st.rerun()
+        for job in job_list:
+            target = job.params.get("base_url") or job.params.get("url")
+            with st.expander(f"{job.kind} · {target} · {job.status}", expanded=job.status == "running"):
+                st.progress(job.progress)
+                cols = st.columns(4)
+                cols[0].metric("Pages", f"{job.pages_done}/{job.pages_total or '?'}")
+                cols[1].metric("Items", job.items)
+                cols[2].metric("Items/s", f"{job.items_per_second:.1f}")
+                cols[3].metric("ETA", f"≤ {job.eta:.0f}s" if job.eta is not None else "–")
+                if job.error:
+                    st.error(job.error)
+                if job.status == "done":
+                    result, df = job_result(job)
+                    finished = datetime.fromtimestamp(job.finished_at, timezone.utc)
+                    st.dataframe(df, use_container_width=True)
+                    st.download_button(
+                        "Download as CSV",
+                        lambda df=df: df.to_csv(index=False),
+                        "products.csv" if job.kind == "products" else "slider_images.csv",
+                        "text/csv",
+                        key=f"download-{job.id}",
+                    )
+                    # bind the loop variables now: the rows are built when a button is clicked
+                    if job.kind == "products":
+                        category = category_name(job.params["base_url"])
+                        typed_downloads(
+                            lambda result=result, category=category, finished=finished:
+                                product_rows(result, category, finished),
+                            "products", "products", key=job.id,
+                        )
+                    else:
+                        typed_downloads(
+                            lambda result=result, url=job.params["url"], finished=finished:
+                                slider_rows(result, url, finished),
+                            "slider_images", "slider images", SLIDER_SCHEMA, key=job.id,
+                        )
+                if job.kind == "products" and job.status in ("interrupted", "failed"):
+                    if st.button("Resume job", key=f"resume-{job.id}"):
+                        jobs.resume(job.id)
+                        st.rerun()
+                if job.status not in ("queued", "running"):
+                    if st.button("Delete job", key=f"delete-{job.id}"):
+                        jobs.delete(job.id)
+                        st.rerun()
+
+    job_table()
+
+elif choice == "Price Analytics":
+    st.title("💰 Price Analytics by Category")
+    selected = st.multiselect(
+        "Categories",
+        list(CATEGORY_URLS),
+        default=list(CATEGORY_URLS),
     )
     max_pages = st.number_input(
-        "Max pages to crawl", 1, 100, 10, 1
+        "Max pages to crawl per category", 1, 100, 10, 1
     )
-    if st.button("Fetch & Preview tvs"):
-        if not can_crawl(base_url):
-            st.error("❌ Crawling disallowed by robots.txt.")
+    bins = st.slider("Histogram bins", 5, 60, 20)
+    if st.button("Analyze Prices"):
+        allowed = {
+            name: CATEGORY_URLS[name]
+            for name in selected
+            if can_crawl(CATEGORY_URLS[name])
+        }
+        # same cache key as "Extract All Categories", so either page reuses the other's crawl
+        key = ("catalog", tuple(sorted(allowed)), max_pages)
+        with st.spinner("Crawling categories…"):
+            products = results.get_or_compute(
+                key,
+                lambda: crawl_catalog(allowed, max_pages),
+                CACHE_TTL["catalog"],
+            )
+        if not products:
+            st.warning("No products found.")
         else:
-            with st.spinner("Crawling pages…"):
-                products = extract_all_products(base_url, max_pages)
-            if not products:
-                st.warning("No tvs found.")
+            df = normalize_prices(pd.DataFrame(products))
+            priced = df["price_value"].notna()
+            st.success(f"{priced.sum()} of {len(df)} products have a numeric price.")
+
+            st.subheader("Per-category summary")
+            st.dataframe(price_stats(df), use_container_width=True)
+
+            st.subheader("Price distribution")
+            hist = price_histogram(df, bins=bins)
+            if not hist.empty:
+                st.bar_chart(hist)
+
+            st.subheader("Outliers (outside 1.5 × IQR of their category)")
+            outliers = price_outliers(df)
+            if outliers.empty:
+                st.info("No outliers.")
             else:
-                st.success(f"Collected {len(products)} unique tvs.")
-                per_row = 3
-                for i in range(0, len(products), per_row):
-                    cols = st.columns(per_row)
-                    for col, prod in zip(cols, products[i : i + per_row]):
-                        with col:
-                            if prod["image_url"]:
-                                st.image(prod["image_url"], use_container_width=True)
-                            st.markdown(f"**[{prod['title']}]({prod['link']})**")
-                            st.markdown(f"*{prod['price']}*")
-                df = pd.DataFrame(products)
-                st.download_button(
-                    "Download tvs as CSV",
-                    df.to_csv(index=False),
-                    "tvs.csv",
-                    "text/csv",
+                st.dataframe(
+                    outliers[["category", "title", "price_value", "currency", "low", "high", "link"]],
+                    use_container_width=True,
                 )
-elif choice == "Extract fitness":
-    st.title("📦 Preview Products from Computer List")
-    base_url = st.text_input(
-        "Product list base URL",
-        value="https://dream2000.com/fitness.html",
+
+elif choice == "Product Details":
+    st.title("🔎 Product Detail Pages")
+    selected = st.multiselect(
+        "Categories",
+        list(CATEGORY_URLS),
+        default=list(CATEGORY_URLS),
     )
     max_pages = st.number_input(
-        "Max pages to crawl", 1, 100, 10, 1
+        "Max pages to crawl per category", 1, 100, 10, 1
     )
-    if st.button("Fetch & Preview fitness"):
-        if not can_crawl(base_url):
-            st.error("❌ Crawling disallowed by robots.txt.")
-        else:
-            with st.spinner("Crawling pages…"):
-                products = extract_all_products(base_url, max_pages)
+    max_workers = st.number_input(
+        "Detail pages fetched in parallel", 1, 32, 8, 1
+    )
+    if st.button("Fetch Product Details"):
+        allowed = {
+            name: CATEGORY_URLS[name]
+            for name in selected
+            if can_crawl(CATEGORY_URLS[name])
+        }
+        with st.spinner("Crawling categories…"):
+            products = results.get_or_compute(
+                ("catalog", tuple(sorted(allowed)), max_pages),
+                lambda: crawl_catalog(allowed, max_pages),
+                CACHE_TTL["catalog"],
+            )
+        key = ("details", tuple(sorted(allowed)), max_pages)
+
+        def crawl_details() -> list[dict]:
+            details = []
             if not products:
-                st.warning("No fitness found.")
-            else:
-                st.success(f"Collected {len(products)} unique fitness.")
-                per_row = 3
-                for i in range(0, len(products), per_row):
-                    cols = st.columns(per_row)
-                    for col, prod in zip(cols, products[i : i + per_row]):
-                        with col:
-                            if prod["image_url"]:
-                                st.image(prod["image_url"], use_container_width=True)
-                            st.markdown(f"**[{prod['title']}]({prod['link']})**")
-                            st.markdown(f"*{prod['price']}*")
-                df = pd.DataFrame(products)
-                st.download_button(
-                    "Download fitness as CSV",
-                    df.to_csv(index=False),
-                    "fitness.csv",
-                    "text/csv",
+                return details
+            progress = st.progress(0.0, text="Fetching detail pages…")
+            for detail in crawl_product_details(p for p in products if can_crawl(p["link"])):
+                details.append(detail)
+                progress.progress(
+                    min(1.0, len(details) / len(products)),
+                    text=f"{len(details)} product pages fetched",
                 )
+            progress.empty()
+            return details
+
+        # one detail crawl per key: other sessions wait for it and reuse the result
+        details = results.get_or_compute(key, crawl_details, CACHE_TTL["details"])
+        if not details:
+            st.warning("No products found.")
+        else:
+            df = pd.DataFrame(details)
+            st.success(
+                f"Fetched {len(df)} unique products "
+                f"({len(products) - len(df)} duplicate or failed listings skipped)."
+            )
+            st.metric("In stock", int((df["in_stock"] == True).sum()))
+            table = df.assign(
+                specs=df["specs"].map(len),
+                images=df["images"].map(len),
+            )
+            st.dataframe(
+                table[["category", "title", "sku", "price", "stock_status", "specs", "images", "link"]],
+                use_container_width=True,
+            )
+            st.download_button(
+                "Download product details as JSON Lines",
+                df.to_json(orient="records", lines=True, force_ascii=False),
+                "product_details.jsonl",
+                "application/json",
+            )
+
+elif choice == "Crawl Performance":
+    st.title("⏱️ Crawl Performance")
+    window = st.select_slider(
+        "Time window",
+        options=[60, 300, 900, 3600, 86400],
+        value=900,
+        format_func=lambda s: f"{s // 60} min" if s < 3600 else f"{s // 3600} h",
+    )
+    bucket = st.selectbox("Throughput bucket", ["10s", "30s", "1min", "5min"], index=1)
+
+    @st.fragment(run_every=5)
+    def performance():
+        since = time.time() - window
+        fetches = pd.DataFrame(metrics.events("fetch", since))
+        parses = pd.DataFrame(metrics.events("parse", since))
+        renders = pd.DataFrame(metrics.events("render", since))
+        errors = metrics.events("error", since)
+        if fetches.empty and parses.empty and renders.empty:
+            st.info("No crawl activity in this window yet. Run a crawl from another page.")
+            return
+
+        cols = st.columns(4)
+        cols[0].metric("HTTP responses", len(fetches))
+        cols[1].metric("Errors", len(errors))
+        cols[2].metric("Downloaded", f"{fetches['bytes'].sum() / 1e6:.1f} MB" if not fetches.empty else "0 MB")
+        cols[3].metric("Products parsed", int(parses["products"].sum()) if not parses.empty else 0)
+
+        if not fetches.empty:
+            st.subheader("HTTP latency percentiles (ms)")
+            network = fetches[~fetches["cached"]] if (~fetches["cached"]).any() else fetches
+            st.dataframe(
+                (network[list(HTTP_PHASES)].quantile([0.5, 0.9, 0.99]) * 1000)
+                .round(1)
+                .rename(index=lambda q: f"p{int(q * 100)}"),
+                use_container_width=True,
+            )
+            st.caption(
+                f"{int(fetches['cached'].sum())} responses served from the HTTP cache; "
+                f"status codes: {fetches['status'].value_counts().to_dict()}"
+            )
+
+        st.subheader("Throughput over time")
+        series = {}
+        if not fetches.empty:
+            by_time = fetches.assign(ts=pd.to_datetime(fetches["ts"], unit="s")).set_index("ts")
+            per_bucket = by_time.resample(bucket)
+            seconds = pd.Timedelta(bucket).total_seconds()
+            series["requests/s"] = per_bucket.size() / seconds
+            series["MB/s"] = per_bucket["bytes"].sum() / seconds / 1e6
+        if not parses.empty:
+            by_time = parses.assign(ts=pd.to_datetime(parses["ts"], unit="s")).set_index("ts")
+            series["products/s"] = by_time.resample(bucket)["products"].sum() / pd.Timedelta(bucket).total_seconds()
+        st.line_chart(pd.DataFrame(series).fillna(0))
+
+        if not parses.empty:
+            st.subheader("Parsing")
+            st.dataframe(
+                parses.groupby("kind").agg(
+                    pages=("seconds", "size"),
+                    p50_ms=("seconds", lambda s: s.quantile(0.5) * 1000),
+                    p90_ms=("seconds", lambda s: s.quantile(0.9) * 1000),
+                    products_per_page=("products", "mean"),
+                ).round(1),
+                use_container_width=True,
+            )
+
+        if not renders.empty:
+            st.subheader("Playwright renders")
+            st.dataframe(
+                renders.drop(columns=["type"]).assign(ts=pd.to_datetime(renders["ts"], unit="s")),
+                use_container_width=True,
+            )
+
+    performance()
+
+    with st.expander("Prometheus metrics"):
+        text = metrics.prometheus_text()
+        st.code(text, language="text")
+        st.download_button("Download metrics", text, "metrics.prom", "text/plain")
+    if st.button("Reset metrics"):
+        metrics.reset()
+        st.rerun()
+
 elif choice == "Extract Slider":
     st.title("🎞️ Preview Homepage Slider Images")
     slider_url = st.text_input(
         "Page URL",
         value="https://dream2000.com/"
     )
-    use_playwright = st.checkbox(
-        "Use Playwright to advance slides (JS)", 
-        value=True
-    )
+    slider_modes = {
+        "Auto (static HTML, Playwright if incomplete)": None,
+        "Static HTML only": False,
+        "Always Playwright (JS)": True,
+    }
+    mode = st.radio("Extraction mode", list(slider_modes))
+    use_playwright = slider_modes[mode]
     max_clicks = st.number_input(
         "Max slider clicks (leave 0 for unlimited)",
         min_value=0,
         value=0,
         step=1
     )
+    refresh = st.checkbox("Ignore cached results", value=False)
+
+    if st.button("Extract slider in background"):
+        if not can_crawl(slider_url):
+            st.error("❌ Crawling disallowed by robots.txt.")
+        else:
+            job_id = jobs.submit_slider(slider_url, use_playwright, max_clicks or None)
+            st.info(f"Started job `{job_id}`; follow it on the Background Jobs page.")
 
     if st.button("Fetch & Preview Slider Images"):
         if not can_crawl(slider_url):
             st.error("❌ Crawling disallowed by robots.txt.")
         else:
+            limit = max_clicks or None
+            key = ("slider", slider_url, use_playwright, limit)
+            if refresh:
+                results.invalidate(key)
             with st.spinner("Extracting slider images…"):
-                limit = max_clicks or None
-                imgs = extract_slider_images(
-                    slider_url,
-                    use_playwright=use_playwright,
-                    max_clicks=limit,
-                    slide_delay=1.0
+                imgs = results.get_or_compute(
+                    key,
+                    lambda: extract_slider_images(
+                        slider_url,
+                        use_playwright=use_playwright,
+                        max_clicks=limit,
+                    ),
+                    CACHE_TTL["slider"],
                 )
 
             if not imgs:
@@ -426,12 +709,13 @@ elif choice == "Extract Slider":
 
                 # --- display in a grid: 4 columns per row, images 200px wide ---
                 cols_per_row = 4
+                local = thumbs.get_many(imgs)
                 for row_start in range(0, len(imgs), cols_per_row):
                     row_imgs = imgs[row_start : row_start + cols_per_row]
                     cols = st.columns(len(row_imgs))
                     for col, img_url in zip(cols, row_imgs):
                         with col:
-                            st.image(img_url, width=200)
+                            st.image(local.get(img_url) or img_url, width=200)
 
                 # Download CSV of URLs
                 df = pd.DataFrame({"slider_image_url": imgs})
@@ -441,3 +725,7 @@ elif choice == "Extract Slider":
                     "slider_images.csv",
                     "text/csv"
                 )
+                typed_downloads(
+                    lambda: slider_rows(imgs, slider_url, cached_at(key)),
+                    "slider_images", "slider images", SLIDER_SCHEMA, key="slider",
+                )
@@ -0,0 +1,382 @@
+# bench.py
+#
+# Offline benchmarks against recorded Dream2000 pages.
+#
+#   python bench.py                     run everything, compare with bench_baseline.json
+#   python bench.py --update-baseline   run and store the results as the new baseline
+#   python bench.py record              re-record the fixtures from the live site
+#
+# Exits with status 1 when a result regresses past the tolerance or a crawl
+# returns the wrong products.
+
+import argparse
+import gc
+import gzip
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import data_fetch
+from data_fetch import CATEGORY_URLS, extract_all_products, extract_slider_images, parse_products
+from utils import SITE_URL, disable_http_cache, fetch_url, rate_limiter
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_fixtures")
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+CONCURRENCY_LEVELS = (1, 2, 4, 8)
+
+# metric name suffix -> whether bigger numbers are better
+HIGHER_IS_BETTER = {"pages_per_s": True, "products_per_s": True, "seconds": False, "peak_kib": False}
+
+# Timings this close to the baseline are noise on ~0.1 s replay crawls, whatever the ratio
+MIN_DELTA_SECONDS = 0.02
+
+
+def load_manifest(directory: str = FIXTURES_DIR) -> dict:
+    """
+    The fixture manifest: "pages" maps a request path (with query) to a
+    gzipped HTML file, "expect" maps a listing path to the products/pages a
+    correct crawl returns (and "/" to the number of slider images).
+    """
+    with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_fixture(name: str, directory: str = FIXTURES_DIR) -> bytes:
+    with open(os.path.join(directory, name), "rb") as f:
+        return gzip.decompress(f.read())
+
+
+class ReplayServer:
+    """
+    Local stand-in for dream2000.com serving the recorded pages on
+    127.0.0.1, gzip-encoded like the real site, with an optional fixed
+    `latency` per response to stand in for the network. Unrecorded paths
+    get a 404; robots.txt allows everything.
+    """
+
+    def __init__(self, directory: str = FIXTURES_DIR, latency: float = 0.0):
+        manifest = load_manifest(directory)
+        self.latency = latency
+        self.requests = 0
+        self._bodies = {}
+        for path, name in manifest["pages"].items():
+            with open(os.path.join(directory, name), "rb") as f:
+                self._bodies[path] = f.read()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    def _handler(self):
+        replay = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with replay._lock:
+                    replay.requests += 1
+                if replay.latency:
+                    time.sleep(replay.latency)
+                if self.path == "/robots.txt":
+                    self._send(b"User-agent: *\nAllow: /\n", "text/plain")
+                    return
+                body = replay._bodies.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    self._send(body, "text/html; charset=UTF-8", {"Content-Encoding": "gzip"})
+                else:
+                    self._send(gzip.decompress(body), "text/html; charset=UTF-8")
+
+            def _send(self, body: bytes, content_type: str, headers: dict | None = None):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def start(self) -> "ReplayServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="replay-server", daemon=True)
+        self._thread.start()
+        # no robots.txt round trips or Crawl-delay pacing against the stand-in
+        rate_limiter.set_rate(self.base_url, None)
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def listing_fixtures(manifest: dict) -> list[tuple[str, bytes]]:
+    """(path, html) of every distinct recorded listing page."""
+    seen, pages = set(), []
+    for path, name in manifest["pages"].items():
+        if path != "/" and name not in seen:
+            seen.add(name)
+            pages.append((path, load_fixture(name)))
+    return pages
+
+
+def bench_parse(manifest: dict, backend: str, min_seconds: float = 1.0) -> dict:
+    """Parse every listing fixture in a loop for at least `min_seconds`."""
+    pages = listing_fixtures(manifest)
+    done = products = 0
+    start = time.perf_counter()
+    while True:
+        for path, html in pages:
+            products += len(parse_products(html, path, backend))
+            done += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            break
+    return {
+        f"parse.{backend}.pages_per_s": done / elapsed,
+        f"parse.{backend}.products_per_s": products / elapsed,
+    }
+
+
+# Markup the lxml fast path has to get right: a "</ol>" inside an inline
+# script and a comment, and script/style/template text in a title link.
+EDGE_CASE_LISTING = b"""<html><body><ol class="products list items product-items">
+<li><div class="product-item-info"><a class="product-item-link" href="/a.html">A<script>var x = 1;</script>
+<!-- </ol> --><style>.a {}</style></a><span class="price">EGP 1,000.00</span></div>
+<script>document.write("</ol>");</script></li>
+<li><div class="product-item-info"><a class="product-item-link" href="/b.html">B<template>t</template></a></div></li>
+</ol></body></html>"""
+
+
+def check_parsers(manifest: dict) -> list[str]:
+    """The lxml and bs4 backends must return identical products for every listing."""
+    errors = []
+    pages = listing_fixtures(manifest) + [("edge-case listing", EDGE_CASE_LISTING)]
+    for path, html in pages:
+        fast, reference = parse_products(html, path, "lxml"), parse_products(html, path, "bs4")
+        if fast != reference:
+            errors.append(f"{path}: lxml and bs4 parsers disagree ({len(fast)} vs {len(reference)} products)")
+    return errors
+
+
+def check_crawl(path: str, products: list[dict], expect: dict) -> list[str]:
+    errors = []
+    if len(products) != expect["products"]:
+        errors.append(f"{path}: expected {expect['products']} products, got {len(products)}")
+    if len({p["link"] for p in products}) != len(products):
+        errors.append(f"{path}: duplicate links in the result")
+    return errors
+
+
+def bench_crawl(server: ReplayServer, manifest: dict, repeat: int = 5) -> tuple[dict, list[str]]:
+    """
+    End-to-end extract_all_products() against the replay server for each
+    concurrency level (median of `repeat` runs). The sequential crawl must
+    also stop after exactly one page past the last product page.
+    """
+    results, errors = {}, []
+    for path, expect in manifest["expect"].items():
+        if path == "/":
+            continue
+        name = path.strip("/").removesuffix(".html")
+        for concurrency in CONCURRENCY_LEVELS:
+            timings = []
+            for _ in range(repeat):
+                before = server.requests
+                start = time.perf_counter()
+                products = extract_all_products(server.url(path), max_pages=20, concurrency=concurrency)
+                timings.append(time.perf_counter() - start)
+                requests = server.requests - before
+            errors += check_crawl(f"{path} (concurrency {concurrency})", products, expect)
+            if concurrency == 1 and requests != expect["pages"] + 1:
+                errors.append(f"{path}: expected {expect['pages'] + 1} page fetches, got {requests}")
+            results[f"crawl.{name}.c{concurrency}.seconds"] = statistics.median(timings)
+    return results, errors
+
+
+def bench_slider(server: ReplayServer, manifest: dict) -> tuple[dict, list[str]]:
+    start = time.perf_counter()
+    images = extract_slider_images(server.url("/"), use_playwright=False)
+    seconds = time.perf_counter() - start
+    expected = manifest["expect"]["/"]["slider_images"]
+    errors = [] if len(images) == expected else [f"slider: expected {expected} images, got {len(images)}"]
+    return {"slider.static.seconds": seconds}, errors
+
+
+def bench_memory(server: ReplayServer, manifest: dict) -> dict:
+    """Peak Python heap while crawling every listing sequentially, per parser backend."""
+    results = {}
+    for backend in ("lxml", "bs4"):
+        saved = data_fetch.PARSER_BACKEND
+        data_fetch.PARSER_BACKEND = backend
+        gc.collect()
+        tracemalloc.start()
+        try:
+            for path in manifest["expect"]:
+                if path != "/":
+                    extract_all_products(server.url(path), max_pages=20)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            data_fetch.PARSER_BACKEND = saved
+        results[f"memory.crawl.{backend}.peak_kib"] = peak / 1024
+    return results
+
+
+def run_all(latency: float, repeat: int) -> tuple[dict, list[str]]:
+    disable_http_cache()
+    manifest = load_manifest()
+    results, errors = {}, check_parsers(manifest)
+    for backend in ("lxml", "bs4"):
+        results.update(bench_parse(manifest, backend))
+    with ReplayServer(latency=latency) as server:
+        crawl, crawl_errors = bench_crawl(server, manifest, repeat)
+        slider, slider_errors = bench_slider(server, manifest)
+        results.update(crawl)
+        results.update(slider)
+        results.update(bench_memory(server, manifest))
+    return results, errors + crawl_errors + slider_errors
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta: float = MIN_DELTA_SECONDS) -> list[str]:
+    """
+    Lines of the report table; regressed metrics are marked REGRESSED. A
+    timing only regresses when it is both `tolerance` worse relatively and
+    at least `min_delta` seconds slower.
+    """
+    lines = [f"{'metric':<36} {'value':>12} {'baseline':>12} {'change':>8}"]
+    for name, value in results.items():
+        base = baseline.get(name)
+        status, change = "", ""
+        if base:
+            ratio = value / base
+            change = f"{(ratio - 1) * 100:+.0f}%"
+            unit = name.rsplit(".", 1)[1]
+            higher_better = HIGHER_IS_BETTER[unit]
+            if (higher_better and ratio < 1 - tolerance) or (not higher_better and ratio > 1 + tolerance):
+                if unit != "seconds" or value - base >= min_delta:
+                    status = "REGRESSED"
+        base_text = f"{base:.3f}" if base is not None else "-"
+        lines.append(f"{name:<36} {value:>12.3f} {base_text:>12} {change:>8}  {status}")
+    return lines
+
+
+def record(site: str = SITE_URL, categories: tuple[str, ...] = ("mobiles", "tablets"), directory: str = FIXTURES_DIR):
+    """
+    Re-record the fixtures from the live site: every page of each category
+    up to and including the page that ends pagination (empty or repeated),
+    and the homepage. Expected counts are taken from the current parser.
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = {"pages": {}, "expect": {}}
+
+    def save(url: str, content: bytes) -> str:
+        parsed = urlparse(url)
+        path = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+        name = (parsed.path.strip("/").replace("/", "_").removesuffix(".html") or "home") + \
+            (f"-p{parsed.query.rsplit('=', 1)[-1]}" if parsed.query else "") + ".html.gz"
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(gzip.compress(content, mtime=0))
+        manifest["pages"][path] = name
+        return path
+
+    for category in categories:
+        base_url = CATEGORY_URLS[category]
+        seen, pages = set(), 0
+        for page in range(1, 51):
+            page_url = f"{base_url}?p={page}"
+            content = fetch_url(page_url).content
+            save(page_url, content)
+            links = {p["link"] for p in parse_products(content, page_url)}
+            if not links or links <= seen:
+                break
+            seen |= links
+            pages = page
+        manifest["expect"][urlparse(base_url).path] = {"products": len(seen), "pages": pages}
+        logger.info(f"Recorded {pages} pages of {category} ({len(seen)} products)")
+
+    save(site, fetch_url(site).content)
+    _write_manifest(manifest, directory)
+    with ReplayServer(directory) as server:
+        images = extract_slider_images(server.url("/"), use_playwright=False)
+    manifest["expect"]["/"] = {"slider_images": len(images)}
+    _write_manifest(manifest, directory)
+    logger.info(f"Fixtures written to {directory}")
+
+
+def _write_manifest(manifest: dict, directory: str):
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline crawler benchmarks against recorded pages.")
+    parser.add_argument("command", nargs="?", choices=("run", "record"), default="run")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression (default 0.25)")
+    parser.add_argument("--min-delta", type=float, default=MIN_DELTA_SECONDS,
+                        help=f"ignore timing changes smaller than this many seconds (default {MIN_DELTA_SECONDS})")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated seconds per response (default 0.05)")
+    parser.add_argument("--repeat", type=int, default=5, help="crawl runs per concurrency level, median kept")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        record()
+        return 0
+
+    # the fixtures end pagination on purpose; keep "No product list" warnings out of the report
+    logging.getLogger().setLevel(logging.ERROR)
+    results, errors = run_all(args.latency, args.repeat)
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    lines = compare(results, baseline, args.tolerance, args.min_delta)
+    print("\n".join(lines))
+    for error in errors:
+        print(f"FAILED: {error}")
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump({k: round(v, 4) for k, v in results.items()}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 1 if errors else 0
+
+    regressed = [line for line in lines if line.endswith("REGRESSED")]
+    return 1 if errors or regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+# browser_pool.py
+
+import atexit
+import base64
+import logging
+import queue
+import re
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from playwright.sync_api import Browser, Page, Request, Route, sync_playwright
+
+logger = logging.getLogger(__name__)
+
+# Seconds run() waits for a job before giving up
+RUN_TIMEOUT = 180.0
+
+# 1x1 transparent GIF served in place of stubbed images
+_PIXEL = base64.b64decode("R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7")
+
+
+@dataclass(frozen=True)
+class BlockPolicy:
+    """
+    Which requests a headless render may skip.
+
+    - block_types: resource types aborted outright.
+    - stub_types: resource types answered locally with a 1x1 GIF, so
+      load/error handlers (e.g. the slider's lazy loader) still fire.
+    - block_patterns: URL regexes aborted whatever their type (trackers).
+    - allow_patterns: URL regexes never blocked (the slider's scripts);
+      stubbed types are still stubbed.
+    """
+    block_types: frozenset[str] = frozenset({"font", "media", "texttrack", "eventsource", "websocket", "manifest"})
+    stub_types: frozenset[str] = frozenset({"image"})
+    block_patterns: tuple[str, ...] = (
+        r"google-analytics\.com",
+        r"googletagmanager\.com",
+        r"doubleclick\.net",
+        r"connect\.facebook\.net",
+        r"facebook\.com/tr",
+        r"hotjar\.com",
+        r"clarity\.ms",
+        r"analytics\.tiktok\.com",
+        r"sc-static\.net",
+        r"/(youtube|vimeo)\.com/embed",
+    )
+    allow_patterns: tuple[str, ...] = (
+        r"revslider",
+        r"rs6",
+        r"rbtools",
+        r"jquery",
+        r"requirejs",
+    )
+
+
+# Default policy for renders; ALLOW_ALL turns blocking off.
+BLOCK_POLICY = BlockPolicy()
+ALLOW_ALL = BlockPolicy(block_types=frozenset(), stub_types=frozenset(), block_patterns=())
+
+
+class ResourceBlocker:
+    """
+    Route handler applying a BlockPolicy to one page, counting what it
+    skipped and (via report()) the bytes that were actually downloaded.
+    """
+
+    def __init__(self, policy: BlockPolicy | None = None):
+        self.policy = policy or BLOCK_POLICY
+        self._block = re.compile("|".join(self.policy.block_patterns)) if self.policy.block_patterns else None
+        self._allow = re.compile("|".join(self.policy.allow_patterns)) if self.policy.allow_patterns else None
+        self.blocked: Counter = Counter()
+        self.stubbed: Counter = Counter()
+        self._finished: list[Request] = []
+
+    def attach(self, page: Page):
+        if self.policy != ALLOW_ALL:
+            page.route("**/*", self._handle)
+        page.on("requestfinished", self._finished.append)
+
+    def _handle(self, route: Route):
+        request = route.request
+        url, rtype = request.url, request.resource_type
+        if rtype in self.policy.stub_types:
+            self.stubbed[rtype] += 1
+            route.fulfill(status=200, content_type="image/gif", body=_PIXEL)
+        elif self._allow and self._allow.search(url):
+            route.continue_()
+        elif rtype in self.policy.block_types or (self._block and self._block.search(url)):
+            self.blocked[rtype] += 1
+            route.abort()
+        else:
+            route.continue_()
+
+    def report(self) -> dict:
+        """Counts of skipped requests by type and total bytes downloaded. Call from the page's thread."""
+        downloaded = 0
+        for request in self._finished:
+            try:
+                sizes = request.sizes()
+                downloaded += sizes["responseHeadersSize"] + sizes["responseBodySize"]
+            except Exception:
+                continue
+        return {
+            "requests": len(self._finished),
+            "blocked": dict(self.blocked),
+            "stubbed": dict(self.stubbed),
+            "bytes_downloaded": downloaded,
+        }
+
+
+class BrowserPool:
+    """
+    Pool of long-lived headless Chromium browsers.
+
+    Playwright's sync API is bound to the thread that started it, so each
+    browser lives in its own worker thread. `size` workers means up to
+    `size` pages rendering at once. Every job gets a fresh browser context
+    (no cookies or cache shared between jobs) on an already-running
+    browser. A browser is relaunched when it has disconnected or has
+    served `max_uses` jobs.
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        max_uses: int = 50,
+        headless: bool = True,
+        context_options: dict | None = None,
+    ):
+        self.size = size
+        self.max_uses = max_uses
+        self.headless = headless
+        self.context_options = context_options or {}
+        self._jobs: queue.Queue = queue.Queue()
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._serial = 0
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BrowserPool is closed")
+            # replace workers that died (e.g. Playwright failed to start)
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.size:
+                self._serial += 1
+                t = threading.Thread(
+                    target=self._worker,
+                    name=f"browser-pool-{self._serial}",
+                    daemon=True,
+                )
+                t.start()
+                self._threads.append(t)
+
+    def run(self, fn: Callable[[Page], Any], timeout: float | None = RUN_TIMEOUT) -> Any:
+        """
+        Run fn(page) on a warm browser in a fresh context and return its
+        result. Raises TimeoutError if it takes longer than `timeout` seconds.
+        """
+        self._ensure_started()
+        fut: Future = Future()
+        self._jobs.put((fn, fut))
+        return fut.result(timeout)
+
+    def _launch(self, p) -> Browser:
+        logger.info("Launching pooled Chromium")
+        return p.chromium.launch(headless=self.headless)
+
+    def _worker(self):
+        try:
+            self._serve()
+        except Exception as e:
+            logger.error(f"Browser pool worker failed: {e}")
+            self._fail_pending(e)
+
+    def _fail_pending(self, error: Exception):
+        """Fail every queued job so callers do not wait on a dead worker."""
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                return
+            if job is None:
+                # a close() sentinel meant for another worker
+                self._jobs.put(None)
+                return
+            _, fut = job
+            if fut.set_running_or_notify_cancel():
+                fut.set_exception(error)
+
+    def _serve(self):
+        with sync_playwright() as p:
+            browser: Browser | None = None
+            uses = 0
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    break
+                fn, fut = job
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                try:
+                    # health check / recycling before handing out a page
+                    if browser is not None and (not browser.is_connected() or uses >= self.max_uses):
+                        logger.info(f"Recycling pooled Chromium after {uses} uses")
+                        try:
+                            browser.close()
+                        except Exception:
+                            pass
+                        browser = None
+                    if browser is None:
+                        browser = self._launch(p)
+                        uses = 0
+
+                    context = browser.new_context(**self.context_options)
+                    try:
+                        result = fn(context.new_page())
+                    finally:
+                        context.close()
+                        uses += 1
+                    fut.set_result(result)
+                except Exception as e:
+                    fut.set_exception(e)
+            if browser is not None:
+                browser.close()
+
+    def close(self):
+        """Stop the workers and close their browsers."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            threads = list(self._threads)
+        for _ in threads:
+            self._jobs.put(None)
+        for t in threads:
+            t.join(timeout=30)
+
+
+_pool: BrowserPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Return the process-wide browser pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = BrowserPool()
+                atexit.register(_pool.close)
+    return _pool
@@ -1,35 +1,140 @@
 # data_fetch.py
 
 from bs4 import BeautifulSoup
+import requests
+from lxml import etree
+import lxml.html
 from utils import fetch_url, logger
+from product_store import ProductStore, utc_now
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
-from playwright.sync_api import sync_playwright
+from browser_pool import BlockPolicy, ResourceBlocker, get_browser_pool
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from frontier import Frontier, PersistentFrontier, normalize_url
+from metrics import Timer, metrics
+from typing import Iterable, Iterator
+from contextlib import closing
+import json
+import re
+import threading
 import time
 
 
-def extract_products_from_page(url: str) -> list[dict]:
+# Parser backend for product listings: "lxml" (fast, default) or "bs4".
+PARSER_BACKEND = "lxml"
+
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+_XP_PRODUCT_LIST = etree.XPath(
+    "//ol[" + " and ".join(_has_class(c) for c in ("products", "list", "items", "product-items")) + "]"
+)
+_XP_ITEMS = etree.XPath(".//li")
+_XP_LINK = etree.XPath(f".//a[{_has_class('product-item-link')}]")
+_XP_PRICE = etree.XPath(f".//span[{_has_class('price')}]")
+_XP_IMAGE = etree.XPath(
+    f".//div[{_has_class('product-item-info')}]"
+    f"//div[{_has_class('product-grid__image-wrapper')}]"
+    f"//a//span[{_has_class('product-image-container')}]"
+    f"//span[{_has_class('product-image-wrapper')}]//img"
+)
+_RE_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w-]+)""", re.I)
+_RE_LIST_START = re.compile(r"""<ol\b[^>]*\bclass\s*=\s*["'][^"']*\bproduct-items\b""", re.I)
+# <ol> / </ol> tags, plus comments and raw-text elements whose content must not be counted
+_RE_OL_TAG = re.compile(
+    r"<!--.*?-->|<(script|style|textarea|template)\b.*?</\1\s*>|<(/?)ol\b",
+    re.I | re.S,
+)
+_XP_VISIBLE_TEXT = etree.XPath(
+    ".//text()[not(ancestor::script or ancestor::style or ancestor::template)]"
+)
+
+
+def _decode_html(content: bytes) -> str:
+    """Decode page bytes the way BeautifulSoup would: declared <meta> charset, else UTF-8."""
+    m = _RE_META_CHARSET.search(content, 0, max(2048, len(content) // 20))
+    if m:
+        try:
+            return content.decode(m.group(1).decode("ascii"), errors="replace")
+        except LookupError:
+            pass
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        return content.decode("windows-1252", errors="replace")
+
+
+def _product_list_fragment(html: str) -> str | None:
     """
-    Fetch one page, parse the OL.products.list.items.product-items,
-    and for each LI return a dict with:
-      - image_url
-      - title
-      - link
-      - price
+    Cut the first <ol ... product-items> element out of the page, balancing
+    nested <ol>s and skipping any inside comments, scripts and styles.
     """
-    resp = fetch_url(url)
-    soup = BeautifulSoup(resp.content, "lxml")
+    m = _RE_LIST_START.search(html)
+    if not m:
+        return None
+    depth = 0
+    for tag in _RE_OL_TAG.finditer(html, m.start()):
+        if tag.group(2) is None:
+            continue
+        depth += -1 if tag.group(2) else 1
+        if depth == 0:
+            end = html.find(">", tag.end())
+            return html[m.start(): end + 1] if end != -1 else None
+    return None
+
+
+def _text(el) -> str:
+    """Equivalent of BeautifulSoup's get_text(strip=True): script, style and template text left out."""
+    return "".join(t.strip() for t in _XP_VISIBLE_TEXT(el) if t.strip())
+
+
+def _parse_products_lxml(content: bytes, url: str) -> list[tuple | None] | None:
+    html = _decode_html(content)
+    ol = None
+    fragment = _product_list_fragment(html)
+    if fragment is not None:
+        found = _XP_PRODUCT_LIST(lxml.html.fromstring(fragment))
+        ol = found[0] if found else None
+    if ol is None:
+        # the quick cut missed (unusual class order, unbalanced markup): scan the whole page
+        found = _XP_PRODUCT_LIST(lxml.html.fromstring(html)) if html.strip() else []
+        ol = found[0] if found else None
+    if ol is None:
+        return None
+
+    items = []
+    for li in _XP_ITEMS(ol):
+        a = _XP_LINK(li)
+        if not a:
+            items.append(None)
+            continue
+        a = a[0]
+        price_tag = _XP_PRICE(li)
+        img = _XP_IMAGE(li)
+        items.append((
+            _text(a),
+            (a.get("href") or "").strip(),
+            _text(price_tag[0]) if price_tag else "",
+            (img[0].get("src") or "").strip() if img else "",
+        ))
+    return items
+
+
+def _parse_products_bs4(content: bytes, url: str) -> list[tuple | None] | None:
+    soup = BeautifulSoup(content, "lxml")
 
     ol = soup.select_one("ol.products.list.items.product-items")
     if not ol:
-        logger.warning(f"No product list found on {url}")
-        return []
+        return None
 
-    products = []
+    items = []
     for li in ol.find_all("li"):
         # 1) extract the <a class="product-item-link">
         a = li.select_one("a.product-item-link")
         if not a:
-            logger.debug("Missing <a class='product-item-link'>, skipping LI.")
+            items.append(None)
             continue
 
         title = a.get_text(strip=True)
@@ -47,6 +152,36 @@ def extract_products_from_page(url: str) -> list[dict]:
             "span.product-image-wrapper img"
         )
         image_url = img.get("src", "").strip() if img else ""
+        items.append((title, link, price, image_url))
+    return items
+
+
+_PARSERS = {
+    "lxml": _parse_products_lxml,
+    "bs4": _parse_products_bs4,
+}
+
+
+def parse_products(content: bytes, url: str, backend: str | None = None) -> list[dict]:
+    """
+    Parse the OL.products.list.items.product-items of a listing page and
+    for each LI return a dict with image_url, title, link and price.
+
+    `backend` selects the parser ("lxml" or "bs4"); both give identical
+    output. Defaults to PARSER_BACKEND.
+    """
+    parser = _PARSERS[backend or PARSER_BACKEND]
+    items = parser(content, url)
+    if items is None:
+        logger.warning(f"No product list found on {url}")
+        return []
+
+    products = []
+    for item in items:
+        if item is None:
+            logger.debug("Missing <a class='product-item-link'>, skipping LI.")
+            continue
+        title, link, price, image_url = item
 
         if not image_url:
             logger.debug(f"No image found for product '{title}'.")
@@ -62,121 +197,717 @@ def extract_products_from_page(url: str) -> list[dict]:
 
     return products
 
-def extract_all_products(base_url: str, max_pages: int = 20) -> list[dict]:
+
+def extract_products_from_page(url: str, backend: str | None = None) -> list[dict]:
+    """
+    Fetch one page, parse the OL.products.list.items.product-items,
+    and for each LI return a dict with:
+      - image_url
+      - title
+      - link
+      - price
+    """
+    resp = fetch_url(url)
+    with Timer() as t:
+        products = parse_products(resp.content, url, backend)
+    metrics.observe_parse("listing", url, t.seconds, len(products))
+    return products
+
+def _page_url(base_url: str, page: int) -> str:
+    """Return base_url with its ?p= query parameter set to `page`."""
+    parsed = urlparse(base_url)
+    qs = parse_qs(parsed.query)
+    qs["p"] = [str(page)]
+    return urlunparse(parsed._replace(query=urlencode(qs, doseq=True)))
+
+
+def _iter_pages(base_url: str, max_pages: int, concurrency: int = 1, start: int = 1):
+    """
+    Yield (page, products) for pages start..max_pages, strictly in page order.
+
+    With concurrency > 1, up to `concurrency` upcoming pages are fetched
+    speculatively in a thread pool. When the caller stops iterating (last
+    page detected), queued fetches are cancelled and in-flight ones ignored.
+    """
+    if concurrency <= 1:
+        for page in range(start, max_pages + 1):
+            page_url = _page_url(base_url, page)
+            logger.info(f"Fetching page {page}: {page_url}")
+            yield page, extract_products_from_page(page_url)
+        return
+
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="page-fetch")
+    pending: dict[int, Future] = {}
+    next_page = start
+    try:
+        for page in range(start, max_pages + 1):
+            # keep the prefetch window full
+            while next_page <= max_pages and len(pending) < concurrency:
+                page_url = _page_url(base_url, next_page)
+                logger.info(f"Fetching page {next_page}: {page_url}")
+                pending[next_page] = pool.submit(extract_products_from_page, page_url)
+                next_page += 1
+            yield page, pending.pop(page).result()
+    finally:
+        for fut in pending.values():
+            fut.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_product_pages(
+    base_url: str,
+    max_pages: int = 20,
+    concurrency: int = 1,
+    checkpoint: PersistentFrontier | None = None,
+):
+    """
+    Generator form of extract_all_products(): paginate through
+    base_url?p=1..max_pages and yield (page, new_products) as each page
+    arrives, where new_products are the products whose link was not seen
+    on an earlier page. Stops on an empty page or a page of duplicates.
+
+    With a `checkpoint` frontier, every page's products are recorded in it
+    (and their links queued for the detail crawl). A later call with the
+    same frontier first replays the recorded pages without fetching them,
+    then carries on from the next page, or stops if pagination had already
+    finished.
+
+    The generator's return value (StopIteration.value) is True when a stop
+    rule ended pagination, i.e. the whole listing was seen, and False when
+    it only ran out of max_pages.
+    """
+    seen_links = set()
+    start = 1
+
+    if checkpoint is not None:
+        for page, prods in checkpoint.pages(base_url):
+            seen_links.update(p["link"] for p in prods)
+            start = page + 1
+            yield page, prods
+        finished = checkpoint.get_meta(f"finished:{base_url}")
+        if finished:
+            return finished == "end"
+
+    reached_end = False
+    try:
+        with closing(_iter_pages(base_url, max_pages, concurrency, start)) as pages:
+            for page, prods in pages:
+                if not prods:
+                    logger.info("No products on this page; stopping pagination.")
+                    reached_end = True
+                    break
+
+                # filter out already-seen links
+                new_items = [p for p in prods if p["link"] not in seen_links]
+                if not new_items:
+                    logger.info("All products on this page were duplicates; stopping.")
+                    reached_end = True
+                    break
+
+                for p in new_items:
+                    seen_links.add(p["link"])
+                if checkpoint is not None:
+                    checkpoint.save_page(base_url, page, new_items)
+                    checkpoint.add_many(p["link"] for p in new_items if p["link"])
+                yield page, new_items
+            if checkpoint is not None:
+                checkpoint.set_meta(f"finished:{base_url}", "end" if reached_end else "max_pages")
+    finally:
+        # the pages recorded so far must survive an exception in the crawl
+        if checkpoint is not None:
+            checkpoint.checkpoint()
+    return reached_end
+
+
+def iter_products(
+    base_url: str,
+    max_pages: int = 20,
+    concurrency: int = 1,
+    checkpoint: PersistentFrontier | None = None,
+):
+    """Yield deduplicated product dicts one at a time, page by page."""
+    with closing(iter_product_pages(base_url, max_pages, concurrency, checkpoint)) as pages:
+        for _, prods in pages:
+            yield from prods
+
+
+def extract_all_products(
+    base_url: str,
+    max_pages: int = 20,
+    concurrency: int = 1,
+    checkpoint: PersistentFrontier | None = None,
+) -> list[dict]:
     """
     Paginate through base_url?p=1..max_pages, call extract_products_from_page()
     on each, and accumulate a deduplicated list of product dicts.
     Deduplication is based on the product link.
+
+    With concurrency > 1, a window of upcoming pages is prefetched in
+    parallel; pages are still consumed in order, so the stop rules and the
+    dedup order are the same as the sequential crawl.
+
+    With a `checkpoint` frontier the crawl survives failures: call again
+    with the same frontier and it resumes after the last recorded page.
     """
-    all_products = []
-    seen_links = set()
+    return list(iter_products(base_url, max_pages, concurrency, checkpoint))
 
-    parsed = urlparse(base_url)
-    qs = parse_qs(parsed.query)
 
-    for page in range(1, max_pages + 1):
-        qs["p"] = [str(page)]
-        new_query = urlencode(qs, doseq=True)
-        paged = parsed._replace(query=new_query)
-        page_url = urlunparse(paged)
+def crawl_incremental(
+    base_url: str,
+    store: ProductStore,
+    max_pages: int = 20,
+    concurrency: int = 1,
+    category: str | None = None,
+) -> dict[str, list[dict]]:
+    """
+    Crawl one category into `store` and return only what changed since the
+    last crawl: {"new": [...], "removed": [...], "repriced": [...]}.
 
-        logger.info(f"Fetching page {page}: {page_url}")
-        prods = extract_products_from_page(page_url)
-        if not prods:
-            logger.info("No products on this page; stopping pagination.")
-            break
+    Each page is upserted as one batch as it arrives. Products are only
+    marked removed when a stop rule (empty or all-duplicate page) ended
+    pagination, so neither an aborted crawl nor one cut short by
+    `max_pages` flags the unvisited pages as gone.
+    """
+    category = category or category_name(base_url)
+    started = utc_now()
+    delta = {"new": [], "removed": [], "repriced": []}
 
-        # filter out already-seen links
-        new_items = [p for p in prods if p["link"] not in seen_links]
-        if not new_items:
-            logger.info("All products on this page were duplicates; stopping.")
+    pages = iter_product_pages(base_url, max_pages, concurrency)
+    while True:
+        try:
+            page, prods = next(pages)
+        except StopIteration as stop:
+            reached_end = stop.value
             break
+        new, repriced = store.upsert(prods, category)
+        delta["new"].extend(new)
+        delta["repriced"].extend(repriced)
+
+    if reached_end:
+        delta["removed"] = store.mark_removed(category, started)
+    else:
+        logger.warning(f"Category '{category}' stopped at max_pages={max_pages}; not marking products removed")
+    logger.info(
+        f"Category '{category}': {len(delta['new'])} new, "
+        f"{len(delta['repriced'])} repriced, {len(delta['removed'])} removed"
+    )
+    return delta
+
+
+CATEGORY_URLS = {
+    "mobiles": "https://dream2000.com/mobiles.html",
+    "tablets": "https://dream2000.com/tablets.html",
+    "laptops": "https://dream2000.com/laptop-notebook.html",
+    "accessories": "https://dream2000.com/accessories.html",
+    "corporate": "https://dream2000.com/corporate.html",
+    "appliances": "https://dream2000.com/home-appliances.html",
+    "conditioners": "https://dream2000.com/conditioners.html",
+    "tvs": "https://dream2000.com/tvs/brands.html",
+    "fitness": "https://dream2000.com/fitness.html",
+}
+
 
-        all_products.extend(new_items)
-        for p in new_items:
-            seen_links.add(p["link"])
+def category_name(base_url: str) -> str:
+    """
+    Category tag of a listing URL: its CATEGORY_URLS key when it is one of
+    the known categories (e.g. 'laptops'), so every crawl path stores a
+    category under the same name; otherwise derived from the path, e.g.
+    '.../tvs/brands.html' -> 'tvs/brands'.
+    """
+    url = normalize_url(base_url)
+    for name, known in CATEGORY_URLS.items():
+        if normalize_url(known) == url:
+            return name
+    path = urlparse(base_url).path.strip("/")
+    return path[:-5] if path.endswith(".html") else path
+
+
+def crawl_catalog(
+    categories: dict[str, str] | list[str] | None = None,
+    max_pages: int = 20,
+    max_workers: int = 4,
+    per_host: int = 2,
+    page_concurrency: int = 1,
+    checkpoint: PersistentFrontier | None = None,
+) -> list[dict]:
+    """
+    Crawl several category listings concurrently on top of extract_all_products()
+    and return one merged list, each product dict tagged with a "category" key.
+
+    Args:
+        categories: Mapping of category name -> base URL, or a plain list of base
+            URLs (names are derived from the URL path). Defaults to CATEGORY_URLS.
+        max_pages: Page limit passed to extract_all_products() per category.
+        max_workers: Global cap on categories crawled at the same time.
+        per_host: Maximum categories crawled at the same time against one host.
+        page_concurrency: Prefetch window passed to extract_all_products().
+        checkpoint: Frontier shared by every category, so a failed catalog
+            crawl resumes each category where it stopped.
+
+    Results keep the order of `categories`. A category that fails is logged
+    and contributes no products instead of aborting the whole crawl.
+    """
+    if categories is None:
+        categories = CATEGORY_URLS
+    if not isinstance(categories, dict):
+        categories = {category_name(u): u for u in categories}
+
+    host_slots: dict[str, threading.BoundedSemaphore] = {}
+    for base_url in categories.values():
+        host = urlparse(base_url).netloc
+        host_slots.setdefault(host, threading.BoundedSemaphore(per_host))
+
+    def crawl_one(name: str, base_url: str) -> list[dict]:
+        with host_slots[urlparse(base_url).netloc]:
+            logger.info(f"Crawling category '{name}': {base_url}")
+            prods = extract_all_products(base_url, max_pages, page_concurrency, checkpoint)
+        logger.info(f"Category '{name}': {len(prods)} products")
+        return [{**p, "category": name} for p in prods]
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="catalog") as pool:
+        futures = {
+            name: pool.submit(crawl_one, name, base_url)
+            for name, base_url in categories.items()
+        }
+        merged = []
+        for name, fut in futures.items():
+            try:
+                merged.extend(fut.result())
+            except Exception as e:
+                logger.error(f"Category '{name}' failed: {e}")
+
+    return merged
+
+
+_XP_DETAIL_TITLE = etree.XPath(f"//h1[{_has_class('page-title')}]")
+_XP_DETAIL_META = etree.XPath("//meta[@property=$name or @name=$name or @itemprop=$name]/@content")
+_XP_DETAIL_SKU = etree.XPath("//*[@itemprop='sku']")
+_XP_DETAIL_PRICE = etree.XPath(
+    f"//div[{_has_class('product-info-main')}]//span[{_has_class('price-wrapper')}]//span[{_has_class('price')}]"
+    f" | //div[{_has_class('product-info-main')}]//span[{_has_class('price')}]"
+)
+_XP_DETAIL_STOCK = etree.XPath(f"//div[{_has_class('product-info-main')}]//div[{_has_class('stock')}]")
+_XP_SPEC_ROWS = etree.XPath("//table[@id='product-attribute-specs-table']//tr")
+_XP_JSON_LD = etree.XPath("//script[@type='application/ld+json']/text()")
+_XP_MAGENTO_INIT = etree.XPath("//script[@type='text/x-magento-init']/text()")
+_XP_DETAIL_GALLERY = etree.XPath(f"//div[{_has_class('gallery-placeholder')}]//img/@src")
+
+_IN_STOCK = ("instock", "in stock", "available", "متوفر", "متاح")
+_OUT_OF_STOCK = ("outofstock", "out of stock", "unavailable", "غير متوفر", "نفذ")
+
+
+def _json_scripts(xpath, doc) -> Iterator:
+    for text in xpath(doc):
+        try:
+            yield json.loads(text)
+        except ValueError:
+            continue
+
+
+def _find_key(obj, key: str):
+    """First value stored under `key` anywhere in a nested JSON structure."""
+    stack = [obj]
+    while stack:
+        cur = stack.pop()
+        if isinstance(cur, dict):
+            if key in cur:
+                return cur[key]
+            stack.extend(cur.values())
+        elif isinstance(cur, list):
+            stack.extend(cur)
+    return None
+
+
+def _json_ld_product(doc) -> dict:
+    for data in _json_scripts(_XP_JSON_LD, doc):
+        if isinstance(data, dict):
+            data = data.get("@graph", [data])
+        if not isinstance(data, list):
+            continue
+        for item in data:
+            if isinstance(item, dict) and item.get("@type") == "Product":
+                return item
+    return {}
 
-    return all_products
+
+def _gallery_position(img: dict) -> int:
+    try:
+        return int(img.get("position") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _gallery_images(doc) -> list[str]:
+    """Full-size image URLs from the Magento gallery widget config, in gallery order."""
+    for data in _json_scripts(_XP_MAGENTO_INIT, doc):
+        gallery = _find_key(data, "mage/gallery/gallery")
+        if isinstance(gallery, dict) and isinstance(gallery.get("data"), list):
+            images = [img for img in gallery["data"] if isinstance(img, dict)]
+            return [
+                img.get("full") or img.get("img")
+                for img in sorted(images, key=_gallery_position)
+                if isinstance(img.get("full") or img.get("img"), str)
+            ]
+    return []
+
+
+def _stock_status(doc, ld: dict) -> tuple[str, bool | None]:
+    stock = _XP_DETAIL_STOCK(doc)
+    if stock:
+        classes = f" {stock[0].get('class', '')} "
+        text = _text(stock[0])
+        if " unavailable " in classes:
+            return text or "Out of stock", False
+        if " available " in classes:
+            return text or "In stock", True
+        status = text
+    else:
+        offers = ld.get("offers") or {}
+        if isinstance(offers, list):
+            offers = offers[0] if offers else {}
+        status = str(offers.get("availability") or "").rsplit("/", 1)[-1]
+    lowered = status.lower()
+    if any(s in lowered for s in _OUT_OF_STOCK):
+        return status, False
+    if any(s in lowered for s in _IN_STOCK):
+        return status, True
+    return status, None
+
+
+def parse_product_detail(content: bytes, url: str) -> dict:
+    """
+    Parse a product page into a dict with link, title, sku, price,
+    stock_status, in_stock (True/False, None if unknown), specs (label ->
+    value from the "More Information" table) and images (every gallery
+    image, full size). Falls back to the page's JSON-LD and meta tags where
+    the markup is missing.
+    """
+    html = _decode_html(content)
+    if not html.strip():
+        raise ValueError(f"Empty product page: {url}")
+    doc = lxml.html.fromstring(html)
+    ld = _json_ld_product(doc)
+
+    title = _XP_DETAIL_TITLE(doc)
+    title = _text(title[0]) if title else (ld.get("name") or "".join(_XP_DETAIL_META(doc, name="og:title")[:1]))
+
+    sku = _XP_DETAIL_SKU(doc)
+    sku = (sku[0].get("content") or _text(sku[0])) if sku else str(ld.get("sku") or "")
+
+    price = _XP_DETAIL_PRICE(doc)
+    price = _text(price[0]) if price else "".join(_XP_DETAIL_META(doc, name="product:price:amount")[:1])
+
+    stock_status, in_stock = _stock_status(doc, ld)
+
+    specs = {}
+    for row in _XP_SPEC_ROWS(doc):
+        label, value = row.find("th"), row.find("td")
+        if label is not None and value is not None:
+            specs[_text(label)] = _text(value)
+
+    images = _gallery_images(doc)
+    if not images:
+        ld_images = ld.get("image") or []
+        images = [ld_images] if isinstance(ld_images, str) else list(ld_images)
+    if not images:
+        images = _XP_DETAIL_GALLERY(doc) or _XP_DETAIL_META(doc, name="og:image")
+
+    return {
+        "link": url,
+        "title": title,
+        "sku": sku.strip(),
+        "price": price,
+        "stock_status": stock_status,
+        "in_stock": in_stock,
+        "specs": specs,
+        "images": list(dict.fromkeys(i.strip() for i in images if i and i.strip())),
+    }
+
+
+def fetch_product_detail(url: str) -> dict:
+    resp = fetch_url(url)
+    with Timer() as t:
+        detail = parse_product_detail(resp.content, url)
+    metrics.observe_parse("detail", url, t.seconds, 1)
+    return detail
+
+
+def _is_transient(error: Exception) -> bool:
+    """Connection problems, timeouts and 5xx replies may succeed on a retry; 4xx and parse errors will not."""
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code >= 500
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+def crawl_product_details(
+    products: Iterable[dict | str],
+    max_workers: int = 8,
+    frontier: Frontier | None = None,
+    retries: int = 1,
+) -> Iterator[dict]:
+    """
+    Fetch the detail page of every product concurrently and yield the
+    parsed details as each page finishes (completion order, not input order).
+
+    Args:
+        products: Product dicts (e.g. from extract_all_products() or
+            crawl_catalog()) or plain links. Consumed lazily, so it can be a
+            generator such as iter_products().
+        max_workers: Pages fetched at the same time.
+        frontier: Deduplicating frontier; links already queued or done in it
+            are skipped, so the same product listed under several
+            categories is fetched once. A fresh one is used by default.
+        retries: How many times a page that failed with a connection
+            error, timeout or 5xx is re-queued before it is given up on.
+            Other failures (e.g. a 404) are not retried. Failures are
+            logged, never raised.
+
+    Listing fields of the product dict (category, listing image, ...) are
+    kept on the result unless the detail page provides them.
+    """
+    frontier = frontier if frontier is not None else Frontier()
+    source = iter(products)
+    context: dict[str, dict] = {}
+    attempts: dict[str, int] = {}
+    pending: dict[Future, str] = {}
+
+    def next_url() -> str | None:
+        url = frontier.pop()
+        while url is None:
+            item = next(source, None)
+            if item is None:
+                return None
+            link = item if isinstance(item, str) else item.get("link")
+            if link and frontier.add(link):
+                if isinstance(item, dict):
+                    context[normalize_url(link)] = item
+                url = frontier.pop()
+        return url
+
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="detail")
+    try:
+        while True:
+            while len(pending) < max_workers * 2:
+                url = next_url()
+                if url is None:
+                    break
+                pending[pool.submit(fetch_product_detail, url)] = url
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                url = pending.pop(fut)
+                try:
+                    detail = fut.result()
+                except Exception as e:
+                    retry = _is_transient(e) and attempts.get(url, 0) < retries
+                    attempts[url] = attempts.get(url, 0) + 1
+                    logger.warning(f"Detail page failed{' (will retry)' if retry else ''}: {url}: {e}")
+                    frontier.failed(url, retry=retry)
+                    if not retry:
+                        context.pop(url, None)
+                    continue
+                frontier.done(url)
+                listing = context.pop(url, {})
+                merged = {**listing, **{k: v for k, v in detail.items() if v or k not in listing}}
+                merged["link"] = listing.get("link", url)
+                yield merged
+    finally:
+        for fut in pending:
+            fut.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
+        logger.info(f"Detail crawl: {frontier.done_count} done, {frontier.failed_count} failed")
+
+
+SLIDER_ARROW = "rs-arrow.tp-rightarrow.tparrows.hesperiden"
+
+# Key of the currently active Revolution Slider slide (data-key, else its
+# index), or null when no active slide can be told apart.
+_ACTIVE_SLIDE_JS = """(() => {
+  const slides = [...document.querySelectorAll("rs-slide")];
+  let active = slides.find(s => s.getAttribute("data-isactiveslide") === "true");
+  if (!active) {
+    const shown = slides.filter(s => {
+      const cs = getComputedStyle(s);
+      return cs.visibility !== "hidden" && parseFloat(cs.opacity) > 0;
+    });
+    shown.sort((a, b) => (parseInt(getComputedStyle(b).zIndex) || 0) - (parseInt(getComputedStyle(a).zIndex) || 0));
+    active = shown[0];
+  }
+  return active ? (active.getAttribute("data-key") || String(slides.indexOf(active))) : null;
+})()"""
+
+# All slide image sources plus the active slide key, in one round trip.
+_SLIDER_STATE_JS = f"""() => {{
+  const srcs = [];
+  for (const el of document.querySelectorAll("img.tp-rs-img")) srcs.push(el.getAttribute("src"));
+  for (const el of document.querySelectorAll("rs-sbg[data-lazyload]")) srcs.push(el.getAttribute("data-lazyload"));
+  return {{srcs, active: {_ACTIVE_SLIDE_JS}}};
+}}"""
+
+_SLIDE_CHANGED_JS = f"prev => {_ACTIVE_SLIDE_JS} !== prev"
+
+
+_RE_SLIDER_ASSET = re.compile(
+    r"""https?:(?:\\?/){2}[^"'\s<>()]+?\\?/revslider\\?/[^"'\s<>()]+?\.(?:jpe?g|png|webp|gif)""", re.I
+)
+
+
+def _is_placeholder(src: str) -> bool:
+    """Revolution Slider puts a transparent dummy image in src until the real one lazy-loads."""
+    return src.startswith("data:") or src.rsplit("/", 1)[-1].startswith("dummy.")
+
+
+def _static_slider_images(url: str) -> tuple[list[str], int]:
+    """
+    Pull slide image URLs out of the server-rendered HTML: slide <img>s and
+    <rs-sbg> backgrounds (preferring data-lazyload over a dummy src), plus
+    revslider image URLs referenced from inline slider config scripts.
+    Returns (urls, number of slides found in the markup).
+    """
+    resp = fetch_url(url)
+    soup = BeautifulSoup(resp.content, "lxml")
+    srcs = []
+    for img in soup.select("img.tp-rs-img, img.rev-slidebg"):
+        srcs.append(img.get("data-lazyload") or img.get("src", ""))
+    for bg in soup.select("rs-sbg"):
+        srcs.append(bg.get("data-lazyload") or bg.get("src", ""))
+    for script in soup.find_all("script"):
+        text = script.string or ""
+        if "revslider" in text:
+            srcs.extend(m.replace("\\/", "/") for m in _RE_SLIDER_ASSET.findall(text))
+    slides = len(soup.select("rs-slide, .rev_slider li[data-index]"))
+    return srcs, slides
 
 
 def extract_slider_images(
     url: str,
-    use_playwright: bool = True,
+    use_playwright: bool | None = None,
     max_clicks: int | None = None,
-    slide_delay: float = 1.0
+    slide_timeout: float = 5.0,
+    block_policy: BlockPolicy | None = None,
+    min_confidence: float = 1.0,
 ) -> list[str]:
     """
     Extract all unique slider image URLs from the homepage slider.
 
+    - Auto mode (the default) reads the static HTML first and only starts a
+      browser when that result looks incomplete.
     - Supports Playwright for JS-driven sliders, clicking up to `max_clicks` times (if provided).
     - Extracts images from <img class="tp-rs-img"> or from <rs-sbg data-lazyload> attributes within each slide.
+    - Waits for the active slide to change after each click instead of sleeping, and
+      stops as soon as the slider wraps back to a slide it has already shown.
 
     Args:
         url: The page URL containing the slider.
-        use_playwright: Whether to use Playwright for JS-driven navigation.
-        max_clicks: Maximum number of arrow clicks to advance slides. If None, clicks until no arrow is found.
-        slide_delay: Seconds to wait after each click/load.
+        use_playwright: True to always render with Playwright, False for static HTML only,
+            None (auto) for static first with a Playwright fallback.
+        max_clicks: Maximum number of arrow clicks to advance slides. If None, clicks until
+            the slider wraps around or no arrow is found.
+        slide_timeout: Maximum seconds to wait for the slider to appear and for each slide change.
+        block_policy: Requests to skip while rendering (defaults to browser_pool.BLOCK_POLICY:
+            fonts, media and trackers blocked, images stubbed; the slider scripts stay allowed).
+        min_confidence: In auto mode, the static result is accepted when
+            images found / slides in the markup reaches this ratio.
     """
     image_urls: list[str] = []
     seen: set[str] = set()
-    clicks = 0
 
-    if use_playwright:
-        logger.info(f"Launching Playwright to fetch slider from {url}")
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
+    def collect(srcs) -> int:
+        added = 0
+        for src in srcs:
+            src = (src or "").strip()
+            if src and not _is_placeholder(src) and src not in seen:
+                seen.add(src)
+                image_urls.append(src)
+                added += 1
+        return added
+
+    if use_playwright is not True:
+        logger.info(f"Fetching static HTML for slider images from {url}")
+        try:
+            srcs, slides = _static_slider_images(url)
+        except requests.exceptions.RequestException as e:
+            if use_playwright is False:
+                raise
+            logger.warning(f"Static slider fetch failed ({e}); falling back to Playwright.")
+            srcs, slides = [], 0
+        collect(srcs)
+        confidence = min(1.0, len(image_urls) / slides) if slides else 0.0
+        logger.info(
+            f"Static slider pass: {len(image_urls)} images for {slides} slides "
+            f"(confidence {confidence:.2f})"
+        )
+        if use_playwright is False or confidence >= min_confidence:
+            if not image_urls:
+                logger.warning("No slider images found.")
+            return image_urls
+        logger.info("Static slider result looks incomplete; rendering with Playwright.")
+
+    logger.info(f"Rendering slider with pooled Playwright browser: {url}")
+    timeout_ms = slide_timeout * 1000
+
+    def walk_slides(page):
+        blocker = ResourceBlocker(block_policy)
+        blocker.attach(page)
+        started = time.perf_counter()
+        with Timer() as goto:
             page.goto(url, timeout=150000)
-            time.sleep(slide_delay)
-
-            while True:
-                # collect images on current slide
-                for el in page.query_selector_all("img.tp-rs-img"):
-                    src = el.get_attribute("src")
-                    if src and src not in seen:
-                        seen.add(src)
-                        image_urls.append(src)
-                for bg in page.query_selector_all("rs-sbg[data-lazyload]"):
-                    src = bg.get_attribute("data-lazyload")
-                    if src and src not in seen:
-                        seen.add(src)
-                        image_urls.append(src)
-
-                # stop if we've reached the click limit
-                if max_clicks is not None and clicks >= max_clicks:
+        try:
+            page.wait_for_selector(
+                "img.tp-rs-img, rs-sbg[data-lazyload]", state="attached", timeout=timeout_ms
+            )
+        except PlaywrightTimeoutError:
+            logger.debug("No slider markup appeared before the timeout.")
+
+        clicks = 0
+        visited: set[str] = set()
+        while True:
+            state = page.evaluate(_SLIDER_STATE_JS)
+            added = collect(state["srcs"])
+            active = state["active"]
+            if active is not None:
+                if active in visited:
+                    logger.info(f"Slider wrapped back to slide {active!r} after {clicks} clicks.")
                     break
+                visited.add(active)
+            elif clicks and not added:
+                # active slide not detectable: a click that shows nothing new means we wrapped
+                break
 
-                # find and click next arrow
-                arrow = page.query_selector("rs-arrow.tp-rightarrow.tparrows.hesperiden")
-                logger.info(f"arrow :  {arrow}")
+            # stop if we've reached the click limit
+            if max_clicks is not None and clicks >= max_clicks:
+                break
 
-                if not arrow:
-                    break
-                try:
-                    arrow.click()
-                    clicks += 1
-                    time.sleep(slide_delay)
-                except Exception as e:
-                    logger.debug(f"Arrow click failed ({e}); stopping.")
-                    break
+            # find and click next arrow
+            arrow = page.query_selector(SLIDER_ARROW)
+            if not arrow:
+                break
+            try:
+                arrow.click()
+                clicks += 1
+            except Exception as e:
+                logger.debug(f"Arrow click failed ({e}); stopping.")
+                break
 
-            browser.close()
+            try:
+                if active is not None:
+                    page.wait_for_function(_SLIDE_CHANGED_JS, arg=active, timeout=timeout_ms)
+                else:
+                    page.wait_for_load_state("networkidle", timeout=timeout_ms)
+            except PlaywrightTimeoutError:
+                logger.debug("Slide change not detected before the timeout.")
 
-    else:
-        logger.info(f"Fetching static HTML for slider images from {url}")
-        resp = fetch_url(url)
-        soup = BeautifulSoup(resp.content, "lxml")
-        for img in soup.select("img.tp-rs-img"):
-            src = img.get("src", "").strip()
-            if src and src not in seen:
-                seen.add(src)
-                image_urls.append(src)
-        for bg in soup.select("rs-sbg[data-lazyload]"):
-            src = bg.get("data-lazyload", "").strip()
-            if src and src not in seen:
-                seen.add(src)
-                image_urls.append(src)
+        report = blocker.report()
+        seconds = time.perf_counter() - started
+        logger.info(f"Slider render of {url} in {seconds:.2f}s: {report}")
+        metrics.observe_render(
+            "slider", url, seconds, goto=goto.seconds, clicks=clicks, images=len(image_urls),
+            requests=report["requests"], bytes=report["bytes_downloaded"],
+        )
+
+    get_browser_pool().run(walk_slides)
 
     if not image_urls:
         logger.warning("No slider images found.")
-    return image_urls
\ No newline at end of file
+    return image_urls
@@ -0,0 +1,149 @@
+# exports.py
+
+import io
+import json
+from datetime import datetime, timezone
+from typing import IO, Iterable, Iterator
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from data_fetch import CATEGORY_URLS, iter_products
+from prices import parse_price
+
+PRODUCT_SCHEMA = pa.schema([
+    ("category", pa.string()),
+    ("title", pa.string()),
+    ("link", pa.string()),
+    ("price", pa.float64()),
+    ("currency", pa.string()),
+    ("price_text", pa.string()),
+    ("image_url", pa.string()),
+    ("crawled_at", pa.timestamp("us", tz="UTC")),
+])
+
+SLIDER_SCHEMA = pa.schema([
+    ("page_url", pa.string()),
+    ("position", pa.int32()),
+    ("image_url", pa.string()),
+    ("crawled_at", pa.timestamp("us", tz="UTC")),
+])
+
+def product_rows(
+    products: Iterable[dict],
+    category: str | None = None,
+    crawled_at: datetime | None = None,
+) -> Iterator[dict]:
+    """
+    Turn crawled product dicts into typed export rows, one at a time.
+    Pass the time the products were crawled as `crawled_at`; it defaults to
+    now, which is only right for products that are being crawled right now.
+    """
+    crawled_at = crawled_at or datetime.now(timezone.utc)
+    for p in products:
+        price, currency = parse_price(p.get("price", ""))
+        yield {
+            "category": p.get("category", category),
+            "title": p.get("title", ""),
+            "link": p.get("link", ""),
+            "price": price,
+            "currency": currency,
+            "price_text": p.get("price", ""),
+            "image_url": p.get("image_url", ""),
+            "crawled_at": crawled_at,
+        }
+
+
+def slider_rows(image_urls: Iterable[str], page_url: str, crawled_at: datetime | None = None) -> Iterator[dict]:
+    crawled_at = crawled_at or datetime.now(timezone.utc)
+    for position, url in enumerate(image_urls):
+        yield {"page_url": page_url, "position": position, "image_url": url, "crawled_at": crawled_at}
+
+
+def _batches(rows: Iterable[dict], schema: pa.Schema, batch_size: int) -> Iterator[pa.RecordBatch]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield pa.RecordBatch.from_pylist(batch, schema=schema)
+            batch = []
+    if batch:
+        yield pa.RecordBatch.from_pylist(batch, schema=schema)
+
+
+def write_jsonl(rows: Iterable[dict], sink: str | IO[bytes]) -> int:
+    """Stream rows to JSON Lines, one object per line. Returns the row count."""
+    own = isinstance(sink, str)
+    f = open(sink, "wb") if own else sink
+    count = 0
+    try:
+        for row in rows:
+            f.write(json.dumps(row, default=_json_default, ensure_ascii=False).encode("utf-8"))
+            f.write(b"\n")
+            count += 1
+    finally:
+        if own:
+            f.close()
+    return count
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def write_parquet(rows: Iterable[dict], sink: str | IO[bytes], schema: pa.Schema, batch_size: int = 1000) -> int:
+    """Stream rows into a typed Parquet file, one row group per batch. Returns the row count."""
+    count = 0
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for batch in _batches(rows, schema, batch_size):
+            writer.write_batch(batch)
+            count += batch.num_rows
+    return count
+
+
+def write_arrow(rows: Iterable[dict], sink: str | IO[bytes], schema: pa.Schema, batch_size: int = 1000) -> int:
+    """Stream rows into an Arrow IPC (Feather v2) file. Returns the row count."""
+    count = 0
+    with pa.ipc.new_file(sink, schema) as writer:
+        for batch in _batches(rows, schema, batch_size):
+            writer.write_batch(batch)
+            count += batch.num_rows
+    return count
+
+
+_WRITERS = {
+    "jsonl": lambda rows, sink, schema: write_jsonl(rows, sink),
+    "parquet": write_parquet,
+    "arrow": write_arrow,
+}
+
+
+def export_bytes(rows: Iterable[dict], fmt: str, schema: pa.Schema = PRODUCT_SCHEMA) -> bytes:
+    """Serialize rows to an in-memory file, e.g. for a download button."""
+    buf = io.BytesIO()
+    _WRITERS[fmt](rows, buf, schema)
+    return buf.getvalue()
+
+
+def export_catalog(
+    path: str | IO[bytes],
+    fmt: str = "parquet",
+    categories: dict[str, str] | None = None,
+    max_pages: int = 20,
+    concurrency: int = 4,
+) -> int:
+    """
+    Crawl every category and stream all products into one combined file,
+    so memory stays flat however large the catalog is. Returns the row count.
+    """
+    if categories is None:
+        categories = CATEGORY_URLS
+    crawled_at = datetime.now(timezone.utc)
+
+    def rows():
+        for name, base_url in categories.items():
+            yield from product_rows(iter_products(base_url, max_pages, concurrency), name, crawled_at)
+
+    return _WRITERS[fmt](rows(), path, PRODUCT_SCHEMA)
@@ -0,0 +1,332 @@
+# frontier.py
+
+import hashlib
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse, urlunparse
+
+logger = logging.getLogger(__name__)
+
+# URL states, as stored by PersistentFrontier
+QUEUED, IN_FLIGHT, DONE, FAILED = range(4)
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form used for deduplication: lowercase scheme and host, no
+    default port, no fragment, no trailing slash on the path.
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    if (scheme, netloc.rpartition(":")[2]) in (("http", "80"), ("https", "443")):
+        netloc = netloc.rpartition(":")[0]
+    path = parsed.path.rstrip("/") or "/"
+    return urlunparse((scheme, netloc, path, parsed.params, parsed.query, ""))
+
+
+class BloomFilter:
+    """
+    Fixed-size probabilistic set for very large seen-sets: memory depends
+    only on `capacity` and `error_rate` (about 1.8 MB for a million URLs at
+    0.1%), never on how many URLs are added. Membership tests can return
+    false positives at roughly `error_rate` once `capacity` items are in,
+    but never false negatives.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key: str) -> bool:
+        """Insert `key`; returns True if it was (probably) not present before."""
+        new = False
+        for pos in self._positions(key):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                new = True
+        self.count += new
+        return new
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos // 8] & (1 << (pos % 8)) for pos in self._positions(key))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def to_bytes(self) -> bytes:
+        header = json.dumps({"capacity": self.capacity, "error_rate": self.error_rate, "count": self.count})
+        return header.encode() + b"\n" + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BloomFilter":
+        header, _, bits = data.partition(b"\n")
+        meta = json.loads(header)
+        bloom = cls(meta["capacity"], meta["error_rate"])
+        bloom.bits = bytearray(bits)
+        bloom.count = meta["count"]
+        return bloom
+
+
+class Frontier:
+    """
+    Thread-safe crawl frontier: a FIFO of URLs waiting to be fetched plus
+    the set of every URL ever queued, so each URL is handed out once no
+    matter how many times it is discovered (e.g. a product listed in
+    several categories).
+
+    URLs move queued -> in flight (pop) -> done, or back to queued when a
+    failed fetch is retried. Pass a BloomFilter as `seen` to bound the
+    memory of the seen-set on very large crawls.
+    """
+
+    def __init__(self, seen: set[str] | BloomFilter | None = None):
+        self._lock = threading.Lock()
+        self._queue: deque[str] = deque()
+        self._seen = seen if seen is not None else set()
+        self._in_flight: set[str] = set()
+        self.done_count = 0
+        self.failed_count = 0
+
+    def add(self, url: str) -> bool:
+        """Queue `url` unless it was queued before; returns True if queued."""
+        url = normalize_url(url)
+        with self._lock:
+            if url in self._seen:
+                return False
+            self._seen.add(url)
+            self._queue.append(url)
+            self._changed(url, QUEUED)
+            return True
+
+    def add_many(self, urls) -> int:
+        return sum(self.add(u) for u in urls)
+
+    def pop(self) -> str | None:
+        """Next URL to fetch (marked in flight), or None if the queue is empty."""
+        with self._lock:
+            if not self._queue:
+                return None
+            url = self._queue.popleft()
+            self._in_flight.add(url)
+            self._changed(url, IN_FLIGHT)
+            return url
+
+    def done(self, url: str):
+        with self._lock:
+            self._in_flight.discard(url)
+            self.done_count += 1
+            self._changed(url, DONE)
+
+    def failed(self, url: str, retry: bool = False):
+        """Drop a failed URL from the in-flight set, re-queueing it if `retry`."""
+        with self._lock:
+            self._in_flight.discard(url)
+            if retry:
+                self._queue.append(url)
+                self._changed(url, QUEUED)
+            else:
+                self.failed_count += 1
+                self._changed(url, FAILED)
+
+    def _changed(self, url: str, state: int):
+        """Hook called (under the lock) on every state change; see PersistentFrontier."""
+
+    def seen(self, url: str) -> bool:
+        with self._lock:
+            return normalize_url(url) in self._seen
+
+    @property
+    def pending(self) -> int:
+        """URLs queued or in flight."""
+        with self._lock:
+            return len(self._queue) + len(self._in_flight)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._queue)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url    TEXT PRIMARY KEY,
+    state  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    scope  TEXT NOT NULL,
+    page   INTEGER NOT NULL,
+    items  TEXT NOT NULL,
+    PRIMARY KEY (scope, page)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key    TEXT PRIMARY KEY,
+    value  BLOB
+);
+"""
+
+
+class PersistentFrontier(Frontier):
+    """
+    Frontier checkpointed to a SQLite file so a crawl can resume where it
+    stopped after a crash, an exception or a dashboard rerun.
+
+    Besides URL states it stores the items of each crawled listing page per
+    scope (one scope per category URL) and small JSON metadata such as the
+    last finished page. Changes are buffered in memory and written in one
+    transaction every `checkpoint_every` changes or `checkpoint_interval`
+    seconds, whichever comes first, and on close(). After a crash the work
+    since the last checkpoint is redone, so fetches are at-least-once.
+    URLs that were in flight are queued again on reopen.
+
+    With `bloom_capacity` set, the seen-set is a BloomFilter saved with each
+    checkpoint and done URLs are dropped from the file, so memory and disk
+    stay bounded however many URLs the crawl has visited.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        bloom_capacity: int | None = None,
+        error_rate: float = 0.001,
+        checkpoint_every: int = 200,
+        checkpoint_interval: float = 5.0,
+    ):
+        self.path = path
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_interval = checkpoint_interval
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+        blob = self._conn.execute("SELECT value FROM meta WHERE key = 'bloom'").fetchone()
+        if blob:
+            seen = BloomFilter.from_bytes(blob[0])
+        elif bloom_capacity:
+            seen = BloomFilter(bloom_capacity, error_rate)
+        else:
+            seen = set()
+        super().__init__(seen)
+        self._bloom = isinstance(seen, BloomFilter)
+
+        self._dirty_urls: dict[str, int] = {}
+        self._dirty_pages: dict[tuple[str, int], str] = {}
+        self._dirty_meta: dict[str, str] = {}
+        self._last_checkpoint = time.monotonic()
+
+        # in-flight URLs of the previous run go first, then the rest of the queue
+        for url, state in self._conn.execute(
+            "SELECT url, state FROM urls WHERE state IN (?, ?) ORDER BY state DESC, rowid",
+            (IN_FLIGHT, QUEUED),
+        ):
+            self._queue.append(url)
+            if not self._bloom:
+                self._seen.add(url)
+        if not self._bloom:
+            for (url,) in self._conn.execute("SELECT url FROM urls WHERE state IN (?, ?)", (DONE, FAILED)):
+                self._seen.add(url)
+        counts = self.get_meta("counts", {})
+        self.done_count = counts.get("done", 0)
+        self.failed_count = counts.get("failed", 0)
+        if self._queue or self.done_count:
+            logger.info(
+                f"Resuming frontier {path}: {len(self._queue)} queued, "
+                f"{self.done_count} done, {self.failed_count} failed"
+            )
+
+    def _changed(self, url: str, state: int):
+        self._dirty_urls[url] = state
+        self._maybe_checkpoint()
+
+    def _maybe_checkpoint(self):
+        dirty = len(self._dirty_urls) + len(self._dirty_pages) + len(self._dirty_meta)
+        if dirty >= self.checkpoint_every or (
+            dirty and time.monotonic() - self._last_checkpoint >= self.checkpoint_interval
+        ):
+            self._checkpoint()
+
+    def save_page(self, scope: str, page: int, items: list[dict], meta: dict | None = None):
+        """
+        Record the items collected from one listing page of `scope`, plus
+        optional metadata (e.g. the page cursor) in the same checkpoint.
+        """
+        with self._lock:
+            self._dirty_pages[(scope, page)] = json.dumps(items, ensure_ascii=False)
+            for key, value in (meta or {}).items():
+                self._dirty_meta[key] = json.dumps(value)
+            self._maybe_checkpoint()
+
+    def pages(self, scope: str) -> list[tuple[int, list[dict]]]:
+        """(page, items) recorded for `scope`, in page order."""
+        with self._lock:
+            self._checkpoint()
+            return [
+                (page, json.loads(items)) for page, items in self._conn.execute(
+                    "SELECT page, items FROM pages WHERE scope = ? ORDER BY page", (scope,)
+                )
+            ]
+
+    def set_meta(self, key: str, value):
+        with self._lock:
+            self._dirty_meta[key] = json.dumps(value)
+            self._maybe_checkpoint()
+
+    def get_meta(self, key: str, default=None):
+        dirty = self._dirty_meta.get(key)
+        if dirty is not None:
+            return json.loads(dirty)
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def checkpoint(self):
+        """Write all buffered changes now."""
+        with self._lock:
+            self._checkpoint()
+
+    def _checkpoint(self):
+        self._dirty_meta["counts"] = json.dumps({"done": self.done_count, "failed": self.failed_count})
+        with self._conn:
+            done = [(u,) for u, s in self._dirty_urls.items() if s == DONE] if self._bloom else []
+            self._conn.executemany(
+                "INSERT INTO urls (url, state) VALUES (?, ?) "
+                "ON CONFLICT (url) DO UPDATE SET state = excluded.state",
+                [(u, s) for u, s in self._dirty_urls.items() if not (self._bloom and s == DONE)],
+            )
+            self._conn.executemany("DELETE FROM urls WHERE url = ?", done)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages (scope, page, items) VALUES (?, ?, ?)",
+                [(scope, page, items) for (scope, page), items in self._dirty_pages.items()],
+            )
+            meta = list(self._dirty_meta.items())
+            if self._bloom:
+                meta.append(("bloom", self._seen.to_bytes()))
+            self._conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", meta)
+        self._dirty_urls.clear()
+        self._dirty_pages.clear()
+        self._dirty_meta.clear()
+        self._last_checkpoint = time.monotonic()
+
+    def close(self):
+        self.checkpoint()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
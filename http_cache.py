@@ -0,0 +1,227 @@
+# http_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+# Headers that describe the wire encoding, not the (already decoded) body we store.
+_SKIP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    url            TEXT PRIMARY KEY,
+    digest         TEXT NOT NULL,
+    size           INTEGER NOT NULL,
+    etag           TEXT,
+    last_modified  TEXT,
+    encoding       TEXT,
+    headers        TEXT NOT NULL,
+    used           INTEGER NOT NULL
+);
+"""
+
+
+class HttpCache:
+    """
+    Persistent, size-bounded HTTP response cache.
+
+    Bodies are content-addressed: each one is written once under
+    objects/<sha256 of body>, so identical pages share a file. index.db
+    (SQLite) maps each URL to its body hash, headers and validators (ETag /
+    Last-Modified) plus a last-used counter for least-recently-used order.
+    When the total size of the stored bodies passes `max_bytes`, the oldest
+    URLs are evicted.
+
+    The index is mirrored in memory along with per-body reference counts
+    and a running byte total, so a store or eviction costs one row write
+    and a few dict updates however large the cache grows.
+
+    Only 200 responses carrying a validator are stored, since anything
+    else could not be revalidated.
+    """
+
+    def __init__(self, directory: str = ".http_cache", max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._objects = os.path.join(directory, "objects")
+        self._lock = threading.Lock()
+        os.makedirs(self._objects, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "index.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+        self._index: OrderedDict[str, dict] = OrderedDict()
+        self._refs: dict[str, int] = {}
+        self._bytes = 0
+        self._used = 0
+        for url, digest, size, etag, last_modified, encoding, headers, used in self._conn.execute(
+            "SELECT url, digest, size, etag, last_modified, encoding, headers, used FROM entries ORDER BY used"
+        ):
+            self._add(url, {
+                "digest": digest, "size": size, "etag": etag, "last_modified": last_modified,
+                "encoding": encoding, "headers": json.loads(headers),
+            })
+            self._used = used
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self._objects, digest)
+
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    def _add(self, url: str, meta: dict):
+        """Insert into the in-memory index, keeping refcounts and the byte total."""
+        self._index[url] = meta
+        self._index.move_to_end(url)
+        refs = self._refs.get(meta["digest"], 0)
+        if not refs:
+            self._bytes += meta["size"]
+        self._refs[meta["digest"]] = refs + 1
+
+    def _drop(self, url: str) -> dict | None:
+        """Remove `url` from the in-memory index, deleting its body once unreferenced."""
+        meta = self._index.pop(url, None)
+        if meta is None:
+            return None
+        refs = self._refs[meta["digest"]] - 1
+        if refs:
+            self._refs[meta["digest"]] = refs
+            return meta
+        del self._refs[meta["digest"]]
+        self._bytes -= meta["size"]
+        try:
+            os.remove(self._object_path(meta["digest"]))
+        except OSError:
+            pass
+        return meta
+
+    def _touch(self, url: str):
+        self._index.move_to_end(url)
+        self._used += 1
+        self._conn.execute("UPDATE entries SET used = ? WHERE url = ?", (self._used, url))
+
+    def _put(self, url: str, meta: dict):
+        old = self._index.get(url)
+        if old is not None and old["digest"] == meta["digest"]:
+            # same body: swap the metadata without touching refcounts or the file
+            self._index[url] = meta
+            self._index.move_to_end(url)
+        else:
+            if old is not None:
+                self._drop(url)
+            self._add(url, meta)
+        self._used += 1
+        self._conn.execute(
+            "INSERT OR REPLACE INTO entries "
+            "(url, digest, size, etag, last_modified, encoding, headers, used) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, meta["digest"], meta["size"], meta.get("etag"), meta.get("last_modified"),
+             meta.get("encoding"), json.dumps(meta["headers"]), self._used),
+        )
+
+    def validators(self, url: str) -> dict:
+        """Conditional request headers for `url`, or {} if it is not cached."""
+        meta = self._index.get(url)
+        if not meta:
+            return {}
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def load(self, url: str) -> requests.Response | None:
+        """Rebuild the cached 200 response for `url` and mark it recently used."""
+        with self._lock, self._conn:
+            meta = self._index.get(url)
+            if not meta:
+                return None
+            try:
+                with open(self._object_path(meta["digest"]), "rb") as f:
+                    body = f.read()
+            except OSError:
+                self._drop(url)
+                self._conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+                return None
+            self._touch(url)
+
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.url = url
+        resp._content = body
+        resp.headers = CaseInsensitiveDict(meta["headers"])
+        resp.encoding = meta.get("encoding")
+        resp.reason = "OK"
+        resp.from_cache = True
+        return resp
+
+    def store(self, url: str, resp: requests.Response):
+        """Store a 200 response that carries an ETag or Last-Modified validator."""
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        if resp.status_code != 200 or not (etag or last_modified):
+            return
+
+        body = resp.content
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        with self._lock, self._conn:
+            if digest not in self._refs or not os.path.exists(path):
+                tmp = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(body)
+                os.replace(tmp, path)
+            self._put(url, {
+                "digest": digest,
+                "size": len(body),
+                "etag": etag,
+                "last_modified": last_modified,
+                "encoding": resp.encoding,
+                "headers": {
+                    k: v for k, v in resp.headers.items() if k.lower() not in _SKIP_HEADERS
+                },
+            })
+            self._evict()
+
+    def refresh(self, url: str, resp: requests.Response):
+        """Merge updated validators from a 304 response into the cached entry."""
+        with self._lock, self._conn:
+            meta = self._index.get(url)
+            if not meta:
+                return
+            meta["etag"] = resp.headers.get("ETag", meta["etag"])
+            meta["last_modified"] = resp.headers.get("Last-Modified", meta["last_modified"])
+            self._touch(url)
+            self._conn.execute(
+                "UPDATE entries SET etag = ?, last_modified = ? WHERE url = ?",
+                (meta["etag"], meta["last_modified"], url),
+            )
+
+    def _evict(self):
+        while self._index and self._bytes > self.max_bytes:
+            url = next(iter(self._index))
+            logger.debug(f"Evicting {url} from HTTP cache")
+            self._drop(url)
+            self._conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+
+    def clear(self):
+        """Remove every cached response."""
+        with self._lock, self._conn:
+            for url in list(self._index):
+                self._drop(url)
+            self._conn.execute("DELETE FROM entries")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
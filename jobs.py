@@ -0,0 +1,218 @@
+# jobs.py
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+
+from data_fetch import extract_slider_images, iter_product_pages
+from frontier import PersistentFrontier
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    """State of one background crawl, as persisted in <jobs dir>/<id>.json."""
+    id: str
+    kind: str                      # "products" or "slider"
+    params: dict
+    status: str = "queued"         # queued | running | done | failed | interrupted
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    pages_done: int = 0
+    pages_total: int | None = None
+    items: int = 0
+    error: str | None = None
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def eta(self) -> float | None:
+        """
+        Seconds left if every remaining page is crawled (an upper bound:
+        pagination usually ends early), or None when unknown.
+        """
+        if self.status != "running" or not self.pages_done or not self.pages_total:
+            return None
+        per_page = self.elapsed / self.pages_done
+        return per_page * max(0, self.pages_total - self.pages_done)
+
+    @property
+    def progress(self) -> float:
+        if self.status == "done":
+            return 1.0
+        if not self.pages_total:
+            return 0.0
+        return min(1.0, self.pages_done / self.pages_total)
+
+
+class JobManager:
+    """
+    Runs category and slider crawls in background worker threads.
+
+    Job state is written to `directory` after every page, and results once
+    the job finishes, so any dashboard session (or a later process) can
+    follow progress and pick up finished results. Jobs that were still
+    queued or running when a previous process exited are marked
+    "interrupted"; product jobs checkpoint their pages and can be resumed.
+    """
+
+    def __init__(self, directory: str = ".crawl_jobs", max_workers: int = 2):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crawl-job")
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+        for job in self._load_all():
+            if job.status in ("queued", "running"):
+                job.status = "interrupted"
+                self._save(job)
+            self._jobs[job.id] = job
+
+    def _path(self, job_id: str, suffix: str = "json") -> str:
+        return os.path.join(self.directory, f"{job_id}.{suffix}")
+
+    def _save(self, job: Job):
+        tmp = self._path(job.id, "json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(asdict(job), f)
+        os.replace(tmp, self._path(job.id))
+
+    def _load_all(self) -> list[Job]:
+        jobs = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json") or name.endswith(".result.json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    jobs.append(Job(**json.load(f)))
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning(f"Skipping unreadable job file {name}: {e}")
+        return jobs
+
+    def submit_products(self, base_url: str, max_pages: int = 20, concurrency: int = 4) -> str:
+        """Queue a category crawl; returns the job id."""
+        params = {"base_url": base_url, "max_pages": max_pages, "concurrency": concurrency}
+        return self._submit("products", params, self._run_products)
+
+    def submit_slider(self, url: str, use_playwright: bool | None = None, max_clicks: int | None = None) -> str:
+        """Queue a slider extraction; returns the job id."""
+        params = {"url": url, "use_playwright": use_playwright, "max_clicks": max_clicks}
+        return self._submit("slider", params, self._run_slider)
+
+    def _submit(self, kind: str, params: dict, runner) -> str:
+        job = Job(id=uuid.uuid4().hex[:12], kind=kind, params=params)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._save(job)
+        self._pool.submit(self._run, job, runner)
+        logger.info(f"Queued {kind} job {job.id}: {params}")
+        return job.id
+
+    def _run(self, job: Job, runner):
+        job.status = "running"
+        job.started_at = time.time()
+        self._save(job)
+        try:
+            result = runner(job)
+            with open(self._path(job.id, "result.json"), "w", encoding="utf-8") as f:
+                json.dump(result, f)
+            job.status = "done"
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        job.finished_at = time.time()
+        self._save(job)
+
+    def _run_products(self, job: Job) -> list[dict]:
+        p = job.params
+        job.pages_total = p["max_pages"]
+        products = []
+        with PersistentFrontier(self._path(job.id, "frontier.db")) as checkpoint:
+            for page, new_items in iter_product_pages(p["base_url"], p["max_pages"], p["concurrency"], checkpoint):
+                products.extend(new_items)
+                job.pages_done = page
+                job.items = len(products)
+                self._save(job)
+        self._remove_checkpoint(job.id)
+        return products
+
+    def _remove_checkpoint(self, job_id: str):
+        for suffix in ("frontier.db", "frontier.db-wal", "frontier.db-shm"):
+            try:
+                os.remove(self._path(job_id, suffix))
+            except OSError:
+                pass
+
+    def resume(self, job_id: str):
+        """
+        Restart an interrupted or failed products job. Pages recorded in its
+        checkpoint are not fetched again.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.kind != "products" or job.status not in ("interrupted", "failed"):
+                raise ValueError(f"Job {job_id} cannot be resumed")
+            job.status = "queued"
+            job.error = None
+            job.finished_at = None
+        self._save(job)
+        self._pool.submit(self._run, job, self._run_products)
+        logger.info(f"Resuming products job {job.id}")
+
+    def _run_slider(self, job: Job) -> list[str]:
+        p = job.params
+        images = extract_slider_images(p["url"], use_playwright=p["use_playwright"], max_clicks=p["max_clicks"])
+        job.items = len(images)
+        return images
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and os.path.exists(self._path(job_id)):
+            with open(self._path(job_id), encoding="utf-8") as f:
+                job = Job(**json.load(f))
+        return job
+
+    def list_jobs(self) -> list[Job]:
+        """All known jobs, newest first."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+    def result(self, job_id: str):
+        """The finished job's result (product dicts or slider URLs), or None."""
+        path = self._path(job_id, "result.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def delete(self, job_id: str):
+        """Forget a finished job and remove its files."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job and job.status in ("queued", "running"):
+                raise ValueError(f"Job {job_id} is still {job.status}")
+            self._jobs.pop(job_id, None)
+        for suffix in ("json", "result.json"):
+            try:
+                os.remove(self._path(job_id, suffix))
+            except OSError:
+                pass
+        self._remove_checkpoint(job_id)
@@ -0,0 +1,294 @@
+# metrics.py
+
+import logging
+import socket
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+try:
+    from urllib3.exceptions import NameResolutionError
+except ImportError:  # urllib3 1.26 reports DNS failures as NewConnectionError
+    NameResolutionError = None
+
+logger = logging.getLogger(__name__)
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+PRODUCTS_BUCKETS = (0, 1, 5, 10, 20, 30, 50, 100)
+
+HTTP_PHASES = ("dns", "connect", "tls", "ttfb", "download", "total")
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + "}"
+
+
+class Metrics:
+    """
+    In-process crawl metrics: Prometheus-style counters and histograms
+    (rendered by prometheus_text()) plus a ring buffer of the most recent
+    raw events for percentiles and throughput charts.
+
+    Events are dicts with a "ts" (epoch seconds) and "type": "fetch" (one
+    HTTP response with its phase timings, bytes, status and whether it was
+    served from the HTTP cache), "error", "parse" (seconds, products found)
+    or "render" (Playwright page work).
+    """
+
+    def __init__(self, max_events: int = 20000):
+        self._lock = threading.Lock()
+        self._events: deque[dict] = deque(maxlen=max_events)
+        self._counters: dict[tuple, float] = {}
+        self._histograms: dict[tuple, _Histogram] = {}
+        self._help: dict[str, tuple[str, str]] = {}
+
+    def _inc(self, name: str, labels: dict, help_: str, value: float = 1.0):
+        key = (name, tuple(sorted(labels.items())))
+        self._help.setdefault(name, ("counter", help_))
+        self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def _observe(self, name: str, labels: dict, value: float, buckets: tuple, help_: str):
+        key = (name, tuple(sorted(labels.items())))
+        self._help.setdefault(name, ("histogram", help_))
+        hist = self._histograms.get(key)
+        if hist is None:
+            hist = self._histograms[key] = _Histogram(buckets)
+        hist.observe(value)
+
+    def observe_fetch(self, url: str, status: int, nbytes: int, phases: dict[str, float], cached: bool = False):
+        host = urlparse(url).netloc
+        with self._lock:
+            self._inc("crawler_http_requests_total", {"host": host, "status": status, "cache": "hit" if cached else "miss"},
+                      "HTTP responses by host, status code and HTTP cache use.")
+            self._inc("crawler_http_response_bytes_total", {"host": host}, "Decoded response body bytes.", nbytes)
+            self._observe("crawler_http_response_bytes", {}, nbytes, BYTES_BUCKETS, "Decoded response body size.")
+            for phase in HTTP_PHASES:
+                self._observe("crawler_http_phase_seconds", {"phase": phase}, phases.get(phase, 0.0),
+                              SECONDS_BUCKETS, "Time spent per HTTP request phase.")
+            self._events.append({
+                "ts": time.time(), "type": "fetch", "url": url, "status": status,
+                "bytes": nbytes, "cached": cached, **{p: phases.get(p, 0.0) for p in HTTP_PHASES},
+            })
+
+    def observe_error(self, url: str, error: BaseException, seconds: float):
+        host = urlparse(url).netloc
+        with self._lock:
+            self._inc("crawler_http_errors_total", {"host": host, "error": type(error).__name__},
+                      "Requests that raised before a response arrived.")
+            self._events.append({
+                "ts": time.time(), "type": "error", "url": url, "error": type(error).__name__, "total": seconds,
+            })
+
+    def observe_parse(self, kind: str, url: str, seconds: float, products: int):
+        """One parsed page of `kind` ("listing", "detail", ...) and the products it yielded."""
+        with self._lock:
+            self._observe("crawler_parse_seconds", {"kind": kind}, seconds, SECONDS_BUCKETS, "HTML parse time per page.")
+            self._observe("crawler_products_per_page", {"kind": kind}, products, PRODUCTS_BUCKETS,
+                          "Products extracted per parsed page.")
+            self._inc("crawler_products_total", {"kind": kind}, "Products extracted.", products)
+            self._events.append({
+                "ts": time.time(), "type": "parse", "kind": kind, "url": url,
+                "seconds": seconds, "products": products,
+            })
+
+    def observe_render(self, kind: str, url: str, seconds: float, **extra):
+        """One Playwright job of `kind` ("html", "slider", ...); `extra` is stored on the event."""
+        with self._lock:
+            self._observe("crawler_render_seconds", {"kind": kind}, seconds, SECONDS_BUCKETS,
+                          "Playwright render time per page.")
+            self._events.append({"ts": time.time(), "type": "render", "kind": kind, "url": url,
+                                 "seconds": seconds, **extra})
+
+    def events(self, type_: str | None = None, since: float | None = None) -> list[dict]:
+        """Copies of the buffered events, oldest first, optionally filtered."""
+        with self._lock:
+            return [
+                dict(e) for e in self._events
+                if (type_ is None or e["type"] == type_) and (since is None or e["ts"] >= since)
+            ]
+
+    def reset(self):
+        with self._lock:
+            self._events.clear()
+            self._counters.clear()
+            self._histograms.clear()
+
+    def prometheus_text(self) -> str:
+        """All counters and histograms in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, (kind, help_) in sorted(self._help.items()):
+                lines.append(f"# HELP {name} {help_}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    for (n, labels), value in sorted(self._counters.items()):
+                        if n == name:
+                            lines.append(f"{name}{_labels(dict(labels))} {value:g}")
+                    continue
+                for (n, labels), hist in sorted(self._histograms.items()):
+                    if n != name:
+                        continue
+                    labels = dict(labels)
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels({**labels, 'le': f'{bound:g}'})} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {hist.count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {hist.sum:g}")
+                    lines.append(f"{name}_count{_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class Timer:
+    """Context manager measuring wall time: `with Timer() as t: ...; t.seconds`."""
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        self.seconds = 0.0
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._start
+
+
+# Connection-level phase timings of the request running on this thread
+_phases = threading.local()
+
+
+def start_phases():
+    _phases.values = {}
+
+
+def take_phases() -> dict[str, float]:
+    values = getattr(_phases, "values", None) or {}
+    _phases.values = {}
+    return values
+
+
+def _add_phase(name: str, seconds: float):
+    values = getattr(_phases, "values", None)
+    if values is not None:
+        values[name] = values.get(name, 0.0) + seconds
+
+
+class _TimedConnectionMixin:
+    """Resolve the host ourselves so DNS and TCP connect are timed separately."""
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            infos = socket.getaddrinfo(self._dns_host, self.port, 0, socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            if NameResolutionError is None:
+                raise NewConnectionError(self, f"Failed to resolve '{self.host}' ({e})") from e
+            raise NameResolutionError(self.host, self, e) from e
+        resolved = time.perf_counter()
+        _add_phase("dns", resolved - start)
+
+        dns_host = self._dns_host
+        error = None
+        try:
+            for *_, sockaddr in infos:
+                # a numeric address makes the parent's own lookup a no-op
+                self._dns_host = sockaddr[0]
+                try:
+                    sock = super()._new_conn()
+                    break
+                except NewConnectionError as e:
+                    error = e
+            else:
+                raise error
+        finally:
+            self._dns_host = dns_host
+        _add_phase("connect", time.perf_counter() - resolved)
+        return sock
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        before = dict(getattr(_phases, "values", None) or {})
+        start = time.perf_counter()
+        super().connect()
+        values = getattr(_phases, "values", None) or {}
+        tcp = sum(values.get(p, 0.0) - before.get(p, 0.0) for p in ("dns", "connect"))
+        _add_phase("tls", max(0.0, time.perf_counter() - start - tcp))
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose new connections record DNS, connect and TLS time."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+def start_metrics_server(port: int = 9108, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve prometheus_text() on http://host:port/metrics from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,106 @@
+# prices.py
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# First number in a price label: "EGP 12,999.00" -> "12,999.00". ASCII
+# digits only: labels go through to_ascii_digits() first.
+PRICE_PATTERN = r"[0-9][0-9,]*(?:\.[0-9]+)?"
+_RE_AMOUNT = re.compile(PRICE_PATTERN)
+
+# Arabic-Indic and Extended Arabic-Indic digits, Arabic thousands and decimal separators
+_ASCII_DIGITS = str.maketrans({
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+    **{chr(0x06F0 + i): str(i) for i in range(10)},
+    "\u066c": ",",
+    "\u066b": ".",
+})
+
+# Spellings of the Egyptian pound seen in price labels
+CURRENCY_ALIASES = {
+    "EGP": "EGP",
+    "LE": "EGP",
+    "L.E": "EGP",
+    "L.E.": "EGP",
+    "ج.م": "EGP",
+    "ج.م.": "EGP",
+    "جنيه": "EGP",
+}
+
+
+def to_ascii_digits(text: str) -> str:
+    """Map Arabic-Indic digits and separators to ASCII: '١٢٬٩٩٩ ج.م' -> '12,999 ج.م'."""
+    return text.translate(_ASCII_DIGITS)
+
+
+def parse_price(text: str) -> tuple[float | None, str | None]:
+    """Split one raw price label such as 'EGP 12,999.00' into (12999.0, 'EGP')."""
+    text = to_ascii_digits(text or "").strip()
+    m = _RE_AMOUNT.search(text)
+    if not m:
+        return None, None
+    amount = float(m.group().replace(",", ""))
+    currency = (text[: m.start()] + text[m.end():]).strip() or None
+    return amount, CURRENCY_ALIASES.get(currency, currency) if currency else None
+
+
+def normalize_prices(df: pd.DataFrame, column: str = "price") -> pd.DataFrame:
+    """
+    Add numeric `price_value` (float64, NaN when missing) and `currency`
+    columns parsed from the raw `column` text, for the whole frame in one
+    vectorized pass.
+    """
+    text = df[column].fillna("").astype(str).str.translate(_ASCII_DIGITS).str.strip()
+    amount = text.str.extract(f"({PRICE_PATTERN})", expand=False)
+    value = pd.to_numeric(amount.str.replace(",", "", regex=False), errors="coerce")
+    currency = (
+        text.str.replace(PRICE_PATTERN, "", n=1, regex=True)
+        .str.strip()
+        .replace(CURRENCY_ALIASES)
+        .replace("", np.nan)
+    )
+    currency = currency.where(value.notna())
+    return df.assign(price_value=value.astype("float64"), currency=currency)
+
+
+def price_stats(df: pd.DataFrame, by: str = "category") -> pd.DataFrame:
+    """Per-group count, min, median, mean and max of `price_value`."""
+    return (
+        df.dropna(subset=["price_value"])
+        .groupby(by)["price_value"]
+        .agg(["count", "min", "median", "mean", "max"])
+        .sort_values("median", ascending=False)
+    )
+
+
+def price_outliers(df: pd.DataFrame, by: str = "category", k: float = 1.5) -> pd.DataFrame:
+    """
+    Rows whose price lies outside [Q1 - k*IQR, Q3 + k*IQR] of their group,
+    with the group bounds attached.
+    """
+    priced = df.dropna(subset=["price_value"])
+    grouped = priced.groupby(by)["price_value"]
+    q1 = grouped.transform("quantile", 0.25)
+    q3 = grouped.transform("quantile", 0.75)
+    iqr = q3 - q1
+    low, high = q1 - k * iqr, q3 + k * iqr
+    mask = (priced["price_value"] < low) | (priced["price_value"] > high)
+    return priced.assign(low=low, high=high)[mask]
+
+
+def price_histogram(df: pd.DataFrame, by: str = "category", bins: int = 20) -> pd.DataFrame:
+    """
+    Counts per price bin (shared bin edges across groups), one column per
+    group, indexed by the bin's lower edge.
+    """
+    priced = df.dropna(subset=["price_value"])
+    if priced.empty:
+        return pd.DataFrame()
+    edges = np.histogram_bin_edges(priced["price_value"].to_numpy(), bins=bins)
+    counts = {
+        name: np.histogram(group.to_numpy(), bins=edges)[0]
+        for name, group in priced.groupby(by)["price_value"]
+    }
+    return pd.DataFrame(counts, index=pd.Index(edges[:-1].round(0), name="price_from"))
@@ -0,0 +1,177 @@
+# product_store.py
+
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    link        TEXT PRIMARY KEY,
+    title       TEXT NOT NULL,
+    price       TEXT NOT NULL,
+    image_url   TEXT NOT NULL,
+    category    TEXT NOT NULL,
+    first_seen  TEXT NOT NULL,
+    last_seen   TEXT NOT NULL,
+    active      INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS products_category ON products (category, active);
+CREATE TABLE IF NOT EXISTS price_history (
+    link     TEXT NOT NULL,
+    price    TEXT NOT NULL,
+    seen_at  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS price_history_link ON price_history (link, seen_at);
+CREATE TABLE IF NOT EXISTS sitemap_urls (
+    loc         TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    lastmod     TEXT,
+    checked_at  TEXT NOT NULL
+);
+"""
+
+_UPSERT = """
+INSERT INTO products (link, title, price, image_url, category, first_seen, last_seen, active)
+VALUES (:link, :title, :price, :image_url, :category, :now, :now, 1)
+ON CONFLICT (link) DO UPDATE SET
+    title = excluded.title,
+    price = excluded.price,
+    image_url = excluded.image_url,
+    category = excluded.category,
+    last_seen = excluded.last_seen,
+    active = 1
+"""
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+
+class ProductStore:
+    """
+    Embedded SQLite store of crawled products, keyed by product link.
+
+    Keeps the latest title/price/image per product, first-seen and
+    last-seen times, and a price history row whenever a product is first
+    seen or its price changes. Products missing from a finished crawl of
+    their category are kept but flagged inactive.
+    """
+
+    def __init__(self, path: str = "products.db", batch_size: int = 500):
+        self.path = path
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def _known(self, links: list[str]) -> dict[str, sqlite3.Row]:
+        known = {}
+        for i in range(0, len(links), self.batch_size):
+            chunk = links[i : i + self.batch_size]
+            marks = ",".join("?" * len(chunk))
+            for row in self._conn.execute(
+                f"SELECT link, price, active FROM products WHERE link IN ({marks})", chunk
+            ):
+                known[row["link"]] = row
+        return known
+
+    def upsert(self, products: list[dict], category: str, now: str | None = None) -> tuple[list[dict], list[dict]]:
+        """
+        Bulk-upsert one batch of product dicts. Returns (new, repriced):
+        products not currently active in the store, and products whose price
+        changed (each repriced dict gets an extra "old_price" key).
+        """
+        now = now or utc_now()
+        products = [p for p in products if p.get("link")]
+        new, repriced, history = [], [], []
+        with self._lock, self._conn:
+            known = self._known([p["link"] for p in products])
+            for p in products:
+                row = known.get(p["link"])
+                if row is None or not row["active"]:
+                    new.append(p)
+                    history.append((p["link"], p["price"], now))
+                elif row["price"] != p["price"]:
+                    repriced.append({**p, "old_price": row["price"]})
+                    history.append((p["link"], p["price"], now))
+            rows = [{**p, "category": category, "now": now} for p in products]
+            for i in range(0, len(rows), self.batch_size):
+                self._conn.executemany(_UPSERT, rows[i : i + self.batch_size])
+            self._conn.executemany(
+                "INSERT INTO price_history (link, price, seen_at) VALUES (?, ?, ?)", history
+            )
+        return new, repriced
+
+    def mark_removed(self, category: str, seen_at: str) -> list[dict]:
+        """
+        Flag active products of `category` not seen since `seen_at` (the
+        start of the crawl) as inactive and return them.
+        """
+        with self._lock, self._conn:
+            removed = [
+                dict(row) for row in self._conn.execute(
+                    "SELECT link, title, price, image_url, category FROM products "
+                    "WHERE category = ? AND active = 1 AND last_seen < ?",
+                    (category, seen_at),
+                )
+            ]
+            self._conn.execute(
+                "UPDATE products SET active = 0 WHERE category = ? AND active = 1 AND last_seen < ?",
+                (category, seen_at),
+            )
+        return removed
+
+    def record_sitemap(self, entries: list[tuple[str, str, str | None]], now: str | None = None) -> list[str]:
+        """
+        Store one batch of (loc, kind, lastmod) sitemap entries and return
+        the locs that are new or whose lastmod differs from the last run.
+        Entries without a lastmod always count as changed.
+        """
+        now = now or utc_now()
+        changed = []
+        with self._lock, self._conn:
+            known = {}
+            locs = [e[0] for e in entries]
+            for i in range(0, len(locs), self.batch_size):
+                chunk = locs[i : i + self.batch_size]
+                marks = ",".join("?" * len(chunk))
+                for row in self._conn.execute(
+                    f"SELECT loc, lastmod FROM sitemap_urls WHERE loc IN ({marks})", chunk
+                ):
+                    known[row["loc"]] = row["lastmod"]
+            for loc, _, lastmod in entries:
+                if lastmod is None or loc not in known or known[loc] != lastmod:
+                    changed.append(loc)
+            self._conn.executemany(
+                "INSERT INTO sitemap_urls (loc, kind, lastmod, checked_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (loc) DO UPDATE SET kind = excluded.kind, lastmod = excluded.lastmod, "
+                "checked_at = excluded.checked_at",
+                [(loc, kind, lastmod, now) for loc, kind, lastmod in entries],
+            )
+        return changed
+
+    def products(self, category: str | None = None, active_only: bool = True) -> list[dict]:
+        sql = "SELECT * FROM products WHERE 1=1"
+        args = []
+        if category is not None:
+            sql += " AND category = ?"
+            args.append(category)
+        if active_only:
+            sql += " AND active = 1"
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql + " ORDER BY rowid", args)]
+
+    def price_history(self, link: str) -> list[tuple[str, str]]:
+        """(seen_at, price) pairs for one product, oldest first."""
+        with self._lock:
+            return [
+                (row["seen_at"], row["price"]) for row in self._conn.execute(
+                    "SELECT seen_at, price FROM price_history WHERE link = ? ORDER BY seen_at", (link,)
+                )
+            ]
@@ -0,0 +1,110 @@
+# rate_limit.py
+
+import math
+import threading
+import time
+from typing import Callable
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at `rate` tokens per second, holding
+    at most `burst` tokens. Callers that find the bucket empty reserve the
+    next token and sleep outside the lock, so waiters are served in order.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, blocking until it is available. Returns seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+def origin(url: str) -> str:
+    """scheme://host[:port] of `url`; a bare host is taken as https."""
+    parsed = urlparse(url if "://" in url else f"https://{url}")
+    return f"{parsed.scheme.lower()}://{parsed.netloc.lower()}"
+
+
+class HostRateLimiter:
+    """
+    Keep one TokenBucket per origin (scheme, host and port). The rate is
+    looked up through `rate_for_url(url)`, which returns (rate, expires_at):
+    requests/second or None for no limit, and the time.monotonic() deadline
+    after which it is looked up again. `default_rate` applies when the rate
+    is None.
+
+    The lookup may also return None when the rate is unknown for now (e.g.
+    robots.txt could not be fetched). Nothing is cached then: the origin
+    keeps its current bucket, or gets one at `default_rate`, and the next
+    request looks the rate up again.
+    """
+
+    def __init__(
+        self,
+        rate_for_url: Callable[[str], tuple[float | None, float] | None],
+        burst: int = 1,
+        default_rate: float | None = None,
+    ):
+        self.rate_for_url = rate_for_url
+        self.burst = burst
+        self.default_rate = default_rate
+        # origin -> (bucket or None for no limit, expires_at)
+        self._buckets: dict[str, tuple[TokenBucket | None, float]] = {}
+        self._lock = threading.Lock()
+
+    def set_rate(self, url: str, rate: float | None, burst: int | None = None):
+        """Pin the rate for the origin of `url` (or a bare host); None removes the limit."""
+        with self._lock:
+            self._buckets[origin(url)] = (TokenBucket(rate, burst or self.burst) if rate else None, math.inf)
+
+    def reset(self):
+        """Forget all per-origin buckets so rates are looked up again."""
+        with self._lock:
+            self._buckets.clear()
+
+    def _bucket(self, url: str) -> TokenBucket | None:
+        key = origin(url)
+        with self._lock:
+            current = self._buckets.get(key)
+            if current and current[1] > time.monotonic():
+                return current[0]
+        # look the rate up outside the lock: it may hit the network
+        looked_up = self.rate_for_url(url)
+        with self._lock:
+            current = self._buckets.get(key)
+            if looked_up is None:
+                if current is None:
+                    rate = self.default_rate
+                    current = self._buckets[key] = (TokenBucket(rate, self.burst) if rate else None, 0.0)
+                return current[0]
+            rate, expires_at = looked_up
+            rate = rate or self.default_rate
+            bucket = current[0] if current else None
+            if not rate:
+                bucket = None
+            elif bucket is None or bucket.rate != rate:
+                bucket = TokenBucket(rate, self.burst)
+            self._buckets[key] = (bucket, expires_at)
+            return bucket
+
+    def acquire(self, url: str) -> float:
+        """Wait for a request slot for the origin of `url`. Returns seconds waited."""
+        bucket = self._bucket(url)
+        return bucket.acquire() if bucket else 0.0
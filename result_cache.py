@@ -0,0 +1,82 @@
+# result_cache.py
+
+import threading
+import time
+from typing import Any, Callable, Hashable
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache of crawl results with per-entry TTLs.
+
+    get_or_compute() is single-flight: when several callers (e.g. several
+    dashboard sessions) ask for the same missing key, one computes it and
+    the others wait for and reuse its result. lock(key) exposes the same
+    per-key lock for callers that compute incrementally.
+    """
+
+    def __init__(self, default_ttl: float = 1800.0):
+        self.default_ttl = default_ttl
+        # key -> (expires_at on the monotonic clock, value, time.time() it was stored)
+        self._data: dict[Hashable, tuple[float, Any, float]] = {}
+        self._key_locks: dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value, _ = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def put(self, key: Hashable, value: Any, ttl: float | None = None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl or self.default_ttl), value, time.time())
+
+    def expires_in(self, key: Hashable) -> float | None:
+        """Seconds until `key` expires, or None if it is not cached."""
+        with self._lock:
+            item = self._data.get(key)
+        if item is None:
+            return None
+        return max(0.0, item[0] - time.monotonic())
+
+    def stored_at(self, key: Hashable) -> float | None:
+        """Epoch seconds when `key` was cached (i.e. when it was computed), or None."""
+        with self._lock:
+            item = self._data.get(key)
+        return item[2] if item is not None else None
+
+    def lock(self, key: Hashable) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], ttl: float | None = None) -> Any:
+        _missing = object()
+        value = self.get(key, _missing)
+        if value is not _missing:
+            return value
+        with self.lock(key):
+            value = self.get(key, _missing)
+            if value is _missing:
+                value = compute()
+                self.put(key, value, ttl)
+            return value
+
+    def invalidate(self, key: Hashable | None = None, prefix: Hashable | None = None):
+        """
+        Drop one key, every tuple key whose first element is `prefix`,
+        or (with no arguments) everything.
+        """
+        with self._lock:
+            if key is not None:
+                self._data.pop(key, None)
+            elif prefix is not None:
+                for k in [k for k in self._data if isinstance(k, tuple) and k and k[0] == prefix]:
+                    del self._data[k]
+            else:
+                self._data.clear()
@@ -0,0 +1,209 @@
+# robots.py
+
+import logging
+import threading
+import time
+import urllib.robotparser
+from dataclasses import dataclass, field
+from typing import Callable
+from urllib.parse import urlparse
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RobotsEntry:
+    """One host's robots.txt, parsed once for both permission checks and the summary."""
+    url: str
+    parser: urllib.robotparser.RobotFileParser
+    allowed: list[str] = field(default_factory=list)
+    disallowed: list[str] = field(default_factory=list)
+    crawl_delay: str | None = None
+    # (user agents of a group, that group's raw Crawl-delay), in file order
+    crawl_delays: list[tuple[list[str], str]] = field(default_factory=list)
+    sitemaps: list[str] = field(default_factory=list)
+    etag: str | None = None
+    last_modified: str | None = None
+    expires_at: float = 0.0
+    unreachable: bool = False  # stand-in after a failed fetch, no rules known
+
+    def crawl_delay_for(self, user_agent: str) -> float | None:
+        """
+        Crawl-delay in seconds (fractions allowed) of the group that applies
+        to `user_agent`, picked like RobotFileParser.request_rate(): the
+        first group naming the agent, else the "*" group.
+        """
+        name = user_agent.split("/")[0].lower()
+        default = None
+        for agents, value in self.crawl_delays:
+            if "*" in agents:
+                default = value if default is None else default
+            elif any(a.lower() in name for a in agents):
+                return _seconds(value)
+        return _seconds(default) if default is not None else None
+
+
+def _seconds(value: str) -> float | None:
+    try:
+        seconds = float(value)
+    except ValueError:
+        logger.warning(f"Ignoring invalid Crawl-delay {value!r}")
+        return None
+    return seconds if seconds > 0 else None
+
+
+def _group_crawl_delays(text: str) -> list[tuple[list[str], str]]:
+    """
+    Crawl-delay per User-agent group, with RobotFileParser's grouping:
+    consecutive User-agent lines share a group, which ends at the next
+    User-agent line after its rules or at an empty line.
+    """
+    groups: list[tuple[list[str], str]] = []
+    agents: list[str] = []
+    in_rules = False
+    for line in text.splitlines():
+        if not line:
+            agents, in_rules = [], False
+            continue
+        key, sep, value = line.split("#", 1)[0].partition(":")
+        if not sep:
+            continue
+        key, value = key.strip().lower(), value.strip()
+        if key == "user-agent":
+            if in_rules:
+                agents, in_rules = [], False
+            agents.append(value)
+        elif agents:
+            in_rules = True
+            if key == "crawl-delay":
+                groups.append((agents, value))
+    return groups
+
+
+def _parse(url: str, text: str) -> RobotsEntry:
+    parser = urllib.robotparser.RobotFileParser(url)
+    parser.parse(text.splitlines())
+    entry = RobotsEntry(url=url, parser=parser)
+    for line in text.splitlines():
+        l = line.strip().lower()
+        if l.startswith('allow:'):    entry.allowed.append(line.split(':',1)[1].strip())
+        elif l.startswith('disallow:'): entry.disallowed.append(line.split(':',1)[1].strip())
+        elif l.startswith('crawl-delay:'): entry.crawl_delay = line.split(':',1)[1].strip()
+        elif l.startswith('sitemap:'):    entry.sitemaps.append(line.split(':',1)[1].strip())
+    entry.crawl_delays = _group_crawl_delays(text)
+    return entry
+
+
+def _fallback(url: str, disallow_all: bool) -> RobotsEntry:
+    parser = urllib.robotparser.RobotFileParser(url)
+    parser.disallow_all = disallow_all
+    parser.allow_all = not disallow_all
+    parser.modified()
+    return RobotsEntry(url=url, parser=parser)
+
+
+class RobotsCache:
+    """
+    Lazily fetch and cache robots.txt per host.
+
+    Nothing is fetched until a host is first asked for. Entries live for
+    `ttl` seconds; after that they are revalidated with a conditional GET
+    (If-None-Match / If-Modified-Since), so an unchanged file costs a 304.
+    If the server errors (5xx) or cannot be reached, the last good copy is
+    kept; with no copy at all the host is treated as disallow-all (RFC 9309
+    §2.3.1.4). Either way the fetch is retried after `error_ttl` seconds.
+    401/403 also mean disallow-all, any other 4xx means allow-all.
+
+    `on_response`, if given, is called with every robots.txt response
+    (e.g. to archive it).
+    """
+
+    def __init__(
+        self,
+        get_session: Callable[[], requests.Session],
+        ttl: float = 3600.0,
+        error_ttl: float = 60.0,
+        timeout: float = 10,
+        on_response: Callable[[requests.Response], None] | None = None,
+    ):
+        self.get_session = get_session
+        self.on_response = on_response
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.timeout = timeout
+        self._entries: dict[str, RobotsEntry] = {}
+        self._host_locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def robots_url(url: str) -> str:
+        parsed = urlparse(url if "://" in url else f"https://{url}")
+        return f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+
+    def get(self, url: str) -> RobotsEntry:
+        """Return the (possibly refreshed) robots.txt entry for the host of `url`."""
+        robots_url = self.robots_url(url)
+        entry = self._entries.get(robots_url)
+        if entry and entry.expires_at > time.monotonic():
+            return entry
+
+        with self._lock:
+            host_lock = self._host_locks.setdefault(robots_url, threading.Lock())
+        with host_lock:
+            entry = self._entries.get(robots_url)
+            if entry and entry.expires_at > time.monotonic():
+                return entry
+            entry = self._refresh(robots_url, entry)
+            self._entries[robots_url] = entry
+            return entry
+
+    def invalidate(self, url: str | None = None):
+        """Drop the cached entry for the host of `url`, or every entry."""
+        with self._lock:
+            if url is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self.robots_url(url), None)
+
+    def _refresh(self, robots_url: str, old: RobotsEntry | None) -> RobotsEntry:
+        headers = {}
+        if old and old.etag:
+            headers["If-None-Match"] = old.etag
+        if old and old.last_modified:
+            headers["If-Modified-Since"] = old.last_modified
+
+        try:
+            resp = self.get_session().get(robots_url, headers=headers, timeout=self.timeout)
+            if self.on_response is not None:
+                self.on_response(resp)
+            if resp.status_code >= 500:
+                resp.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"robots.txt fetch failed for {robots_url}: {e}")
+            if old is None:
+                entry = _fallback(robots_url, disallow_all=True)
+                entry.unreachable = True
+            else:
+                entry = old
+            entry.expires_at = time.monotonic() + self.error_ttl
+            return entry
+
+        if resp.status_code == 304 and old:
+            logger.debug(f"robots.txt unchanged: {robots_url}")
+            entry = old
+        elif resp.status_code in (401, 403):
+            entry = _fallback(robots_url, disallow_all=True)
+        elif resp.status_code >= 400:
+            # same rule as RobotFileParser.read(): any other 4xx means no restrictions
+            entry = _fallback(robots_url, disallow_all=False)
+        else:
+            logger.info(f"Loaded robots.txt from {robots_url}")
+            entry = _parse(robots_url, resp.text)
+            entry.etag = resp.headers.get("ETag")
+            entry.last_modified = resp.headers.get("Last-Modified")
+
+        entry.parser.modified()
+        entry.expires_at = time.monotonic() + self.ttl
+        return entry
@@ -0,0 +1,195 @@
+# sitemap.py
+
+import logging
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterator
+from urllib.parse import urlparse
+
+from lxml import etree
+
+from data_fetch import CATEGORY_URLS
+from product_store import ProductStore
+from utils import SITE_URL, fetch_stream, robots_cache
+
+logger = logging.getLogger(__name__)
+
+_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+_IMAGE_NS = "{http://www.google.com/schemas/sitemap-image/1.1}"
+_CATEGORY_PATHS = tuple(urlparse(u).path.removesuffix(".html") for u in CATEGORY_URLS.values())
+
+
+@dataclass(frozen=True)
+class SitemapEntry:
+    loc: str
+    lastmod: datetime | None
+    kind: str          # "product", "category" or "page"
+
+
+def parse_lastmod(text: str | None) -> datetime | None:
+    """W3C datetime (a date, or a date-time with optional offset) -> aware UTC datetime."""
+    if not text:
+        return None
+    text = text.strip().replace("Z", "+00:00")
+    try:
+        value = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def classify(loc: str, has_image: bool, priority: str | None) -> str:
+    """
+    Guess what a sitemap URL points to. Magento lists product images in
+    the sitemap and gives products the top priority by default; category
+    URLs live under the known category paths.
+    """
+    if has_image or (priority and priority.strip() in ("1", "1.0")):
+        return "product"
+    path = urlparse(loc).path.removesuffix(".html")
+    if any(path == p or path.startswith(p + "/") for p in _CATEGORY_PATHS):
+        return "category"
+    return "page"
+
+
+def _iterparse(url: str, chunk_size: int = 64 * 1024) -> Iterator[tuple[str, etree._Element]]:
+    """
+    Yield ("sitemap" | "url", element) pairs from one sitemap file, feeding
+    the body to a pull parser chunk by chunk (gunzipping .xml.gz files on
+    the fly). Each element is cleared once the caller is done with it, so
+    memory stays flat however long the file is.
+    """
+    parser = etree.XMLPullParser(events=("end",), tag=(f"{_NS}sitemap", f"{_NS}url"), huge_tree=True)
+
+    def drain():
+        for _, el in parser.read_events():
+            yield el.tag[len(_NS):], el
+            el.clear()
+            while el.getprevious() is not None:
+                del el.getparent()[0]
+
+    with fetch_stream(url, timeout=(5, 30)) as resp:
+        inflate = None
+        for chunk in resp.iter_content(chunk_size):
+            if inflate is None:
+                inflate = zlib.decompressobj(16 + zlib.MAX_WBITS) if chunk[:2] == b"\x1f\x8b" else False
+            if not inflate:
+                parser.feed(chunk)
+                yield from drain()
+                continue
+            # Inflate in bounded pieces: sitemaps compress very well
+            while chunk:
+                parser.feed(inflate.decompress(chunk, chunk_size))
+                yield from drain()
+                chunk = inflate.unconsumed_tail
+    parser.close()
+    yield from drain()
+
+
+def iter_sitemap(
+    url: str,
+    since: datetime | None = None,
+    kinds: tuple[str, ...] | None = None,
+    max_depth: int = 3,
+    _seen: set[str] | None = None,
+) -> Iterator[SitemapEntry]:
+    """
+    Stream the URLs listed in a sitemap, following sitemap indexes (up to
+    `max_depth` levels) and gzip-compressed sitemaps.
+
+    Args:
+        url: Sitemap or sitemap index URL.
+        since: Only yield entries whose lastmod is after this time; entries
+            without a lastmod are always yielded. Child sitemaps whose own
+            lastmod is older are skipped entirely.
+        kinds: Restrict to these kinds ("product", "category", "page").
+        max_depth: How many levels of sitemap indexes to follow.
+    """
+    seen = _seen if _seen is not None else set()
+    if url in seen:
+        return
+    seen.add(url)
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+
+    logger.info(f"Reading sitemap {url}")
+    children = []
+    for tag, el in _iterparse(url):
+        loc = (el.findtext(f"{_NS}loc") or "").strip()
+        if not loc:
+            continue
+        lastmod = parse_lastmod(el.findtext(f"{_NS}lastmod"))
+        if since is not None and lastmod is not None and lastmod <= since:
+            continue
+        if tag == "sitemap":
+            children.append(loc)
+            continue
+        has_image = el.find(f"{_IMAGE_NS}image") is not None
+        kind = classify(loc, has_image, el.findtext(f"{_NS}priority"))
+        if kinds is None or kind in kinds:
+            yield SitemapEntry(loc, lastmod, kind)
+
+    if children and max_depth <= 0:
+        logger.warning(f"Not following {len(children)} nested sitemaps of {url}: max depth reached")
+        return
+    for child in children:
+        try:
+            yield from iter_sitemap(child, since, kinds, max_depth - 1, seen)
+        except Exception as e:
+            logger.error(f"Sitemap {child} failed: {e}")
+
+
+def discover_urls(
+    site: str = SITE_URL,
+    since: datetime | None = None,
+    kinds: tuple[str, ...] | None = ("product", "category"),
+) -> Iterator[SitemapEntry]:
+    """
+    Stream product/category URLs from every sitemap listed in the site's
+    robots.txt (falling back to /sitemap.xml), optionally only those
+    changed since `since`. Each URL is yielded once.
+    """
+    sitemaps = robots_cache.get(site).sitemaps
+    if not sitemaps:
+        parsed = urlparse(site)
+        sitemaps = [f"{parsed.scheme}://{parsed.netloc}/sitemap.xml"]
+    seen_sitemaps: set[str] = set()
+    seen_locs: set[str] = set()
+    for sm in sitemaps:
+        try:
+            for entry in iter_sitemap(sm, since, kinds, _seen=seen_sitemaps):
+                if entry.loc not in seen_locs:
+                    seen_locs.add(entry.loc)
+                    yield entry
+        except Exception as e:
+            logger.error(f"Sitemap {sm} failed: {e}")
+
+
+def changed_urls(
+    store: ProductStore,
+    site: str = SITE_URL,
+    kinds: tuple[str, ...] | None = ("product", "category"),
+    batch_size: int = 500,
+) -> Iterator[SitemapEntry]:
+    """
+    Stream the sitemap entries that are new or whose lastmod changed since
+    the previous run recorded in `store`, so a crawl can be scheduled for
+    just those URLs instead of re-paginating whole categories.
+    """
+    batch: list[SitemapEntry] = []
+
+    def flush():
+        rows = [(e.loc, e.kind, e.lastmod.isoformat() if e.lastmod else None) for e in batch]
+        changed = set(store.record_sitemap(rows))
+        return [e for e in batch if e.loc in changed]
+
+    for entry in discover_urls(site, kinds=kinds):
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            yield from flush()
+            batch = []
+    if batch:
+        yield from flush()
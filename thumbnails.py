@@ -0,0 +1,101 @@
+# thumbnails.py
+
+import hashlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from utils import fetch_url
+
+logger = logging.getLogger(__name__)
+
+
+class ThumbnailCache:
+    """
+    Disk cache of resized product/slider images.
+
+    get_many() downloads the missing images concurrently on a bounded
+    thread pool, shrinks each to fit `size`, and stores it as a JPEG named
+    after the SHA-256 of its URL. Cache hits have their mtime bumped, and
+    the least recently used files are evicted once the directory grows
+    past `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        directory: str = ".thumb_cache",
+        size: tuple[int, int] = (320, 320),
+        max_bytes: int = 64 * 1024 * 1024,
+        max_workers: int = 8,
+        quality: int = 80,
+    ):
+        self.directory = directory
+        self.size = size
+        self.max_bytes = max_bytes
+        self.quality = quality
+        os.makedirs(directory, exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumb")
+        self._evict_lock = threading.Lock()
+
+    def path_for(self, url: str) -> str:
+        name = hashlib.sha256(f"{url}|{self.size}".encode()).hexdigest()
+        return os.path.join(self.directory, f"{name}.jpg")
+
+    def _make(self, url: str) -> str | None:
+        path = self.path_for(url)
+        if os.path.exists(path):
+            os.utime(path)
+            return path
+        try:
+            resp = fetch_url(url)
+            with Image.open(io.BytesIO(resp.content)) as img:
+                img.thumbnail(self.size)
+                if img.mode not in ("RGB", "L"):
+                    img = img.convert("RGB")
+                tmp = f"{path}.{threading.get_ident()}.tmp"
+                img.save(tmp, "JPEG", quality=self.quality, optimize=True)
+            os.replace(tmp, path)
+            return path
+        except Exception as e:
+            logger.debug(f"Thumbnail failed for {url}: {e}")
+            return None
+
+    def get_many(self, urls: list[str]) -> dict[str, str | None]:
+        """Map each URL to its local thumbnail path (None if it could not be made)."""
+        unique = [u for u in dict.fromkeys(urls) if u]
+        paths = dict(zip(unique, self._pool.map(self._make, unique)))
+        self.evict(keep={p for p in paths.values() if p})
+        return paths
+
+    def get(self, url: str) -> str | None:
+        return self.get_many([url]).get(url)
+
+    def evict(self, keep: set[str] = frozenset()):
+        """
+        Delete least recently used thumbnails until the cache fits in
+        max_bytes, never touching the paths in `keep` (about to be shown).
+        """
+        with self._evict_lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith(".jpg"):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+            if total <= self.max_bytes:
+                return
+            for _, size, path in sorted(entries):
+                if path in keep:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= self.max_bytes:
+                    break
@@ -1,57 +1,297 @@
 import requests
-import urllib.robotparser
 import logging
-from bs4 import BeautifulSoup
+import threading
+import lxml.html
+from lxml import etree
+import tempfile
 import time
-from playwright.sync_api import sync_playwright
+from concurrent.futures import ThreadPoolExecutor
+from urllib3.util.retry import Retry
+from rate_limit import HostRateLimiter
+from robots import RobotsCache
+from http_cache import HttpCache
+from warc_archive import WarcArchive
+from metrics import TimedHTTPAdapter, Timer, metrics, start_phases, take_phases
+from browser_pool import ALLOW_ALL, BLOCK_POLICY, BlockPolicy, ResourceBlocker, get_browser_pool
 import streamlit as st
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-# Robots.txt parser
-rp = urllib.robotparser.RobotFileParser()
-rp.set_url("https://dream2000.com/robots.txt")
-rp.read()
+SITE_URL = "https://dream2000.com/"
+
+# Shared HTTP session
+USER_AGENT = "SmartCrawler/1.0"
+DEFAULT_TIMEOUT = (5, 10)  # (connect, read) seconds
+POOL_SIZE = 16
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+def _build_session(pool_size: int = POOL_SIZE) -> requests.Session:
+    """
+    Build a keep-alive session with a sized connection pool, compressed
+    transfer and a retry policy for transient connection/5xx errors.
+    """
+    retry = Retry(
+        total=3,
+        connect=3,
+        read=2,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = TimedHTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "User-Agent": USER_AGENT,
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+    })
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+# Robots.txt cache: fetched lazily per host on first use, then revalidated
+# with conditional GETs once the TTL runs out.
+robots_cache = RobotsCache(get_session, on_response=lambda resp: _archive(resp))
+
+
+# Per-host rate limiting from robots.txt
+def robots_rate(url: str) -> tuple[float | None, float] | None:
+    """
+    Allowed requests/second for the origin of `url` from the robots.txt
+    group that applies to USER_AGENT: Crawl-delay (fractional values
+    included) and Request-rate, the stricter one winning, or None if
+    neither is set; paired with the time the robots.txt entry expires.
+    Returns None while robots.txt is unreachable.
+    """
+    entry = robots_cache.get(url)
+    if entry.unreachable:
+        return None
+    rates = []
+    delay = entry.crawl_delay_for(USER_AGENT)
+    if delay:
+        rates.append(1.0 / delay)
+    req_rate = entry.parser.request_rate(USER_AGENT)
+    if req_rate and req_rate.seconds:
+        rates.append(req_rate.requests / req_rate.seconds)
+    return (min(rates) if rates else None), entry.expires_at
+
+
+# Burst allowance: raise rate_limiter.burst to let a few requests through
+# back-to-back before the Crawl-delay pacing kicks in.
+rate_limiter = HostRateLimiter(robots_rate, burst=1)
+
+
+# Optional on-disk response cache (off by default)
+http_cache: HttpCache | None = None
+
+
+def enable_http_cache(directory: str = ".http_cache", max_bytes: int = 256 * 1024 * 1024) -> HttpCache:
+    """Turn on the persistent response cache for every GET made through utils."""
+    global http_cache
+    http_cache = HttpCache(directory, max_bytes)
+    return http_cache
+
+
+def disable_http_cache():
+    global http_cache
+    http_cache = None
+
+
+# Optional WARC archive of every response returned by _get()
+warc_archive: WarcArchive | None = None
+
+
+def enable_warc_archive(directory: str = "warc", max_bytes: int = 1024 ** 3) -> WarcArchive:
+    """
+    Write every response fetched through utils (headers and body) to
+    compressed WARC files: pages, robots.txt, streamed sitemaps and feed
+    probes. A streamed body is archived when its response is closed, as
+    far as it was read; a partly read one is marked WARC-Truncated.
+    Playwright renders are not archived.
+    """
+    global warc_archive
+    if warc_archive is None or warc_archive.directory != directory:
+        disable_warc_archive()
+        warc_archive = WarcArchive(directory, max_bytes=max_bytes)
+    return warc_archive
+
+
+def disable_warc_archive():
+    global warc_archive
+    if warc_archive is not None:
+        warc_archive.close()
+    warc_archive = None
+
+
+def _get(url: str, timeout: float | tuple = DEFAULT_TIMEOUT) -> requests.Response:
+    """
+    Rate-limited GET through the shared session. With the HTTP cache
+    enabled, cached URLs are revalidated and a 304 is answered from disk.
+    With the WARC archive enabled, every returned response is archived.
+    """
+    cache = http_cache
+    headers = cache.validators(url) if cache else {}
+
+    waited = rate_limiter.acquire(url)
+    if waited:
+        logger.debug(f"Rate limiter held {url} for {waited:.2f}s")
+    resp = _timed_get(url, headers, timeout)
+
+    if cache:
+        if resp.status_code == 304 and headers:
+            cached = cache.load(url)
+            if cached is not None:
+                logger.debug(f"Not modified, using cached copy of {url}")
+                cache.refresh(url, resp)
+                metrics.observe_fetch(url, cached.status_code, len(cached.content), resp.timings, cached=True)
+                _archive(cached)
+                return cached
+            # cached body vanished: fetch unconditionally
+            resp = _timed_get(url, {}, timeout)
+        cache.store(url, resp)
+    metrics.observe_fetch(url, resp.status_code, len(resp.content), resp.timings)
+    _archive(resp)
+    return resp
+
+
+def _archive(resp: requests.Response):
+    archive = warc_archive
+    if archive is None:
+        return
+    try:
+        archive.write_response(resp)
+    except Exception as e:
+        logger.error(f"WARC write failed for {resp.url}: {e}")
+
+
+def _archive_streamed(resp: requests.Response):
+    """
+    Archive a stream=True response once it is closed: the body chunks the
+    caller reads through iter_content() are copied to a spooled temp file
+    on the way.
+    """
+    archive = warc_archive
+    if archive is None:
+        return
+    spool = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    complete = False
+    iter_content, close = resp.iter_content, resp.close
+
+    def tee(chunk_size: int = 1, decode_unicode: bool = False):
+        nonlocal complete
+        for chunk in iter_content(chunk_size, decode_unicode):
+            spool.write(chunk.encode(resp.encoding or "utf-8") if isinstance(chunk, str) else chunk)
+            yield chunk
+        complete = True
+
+    def close_and_archive():
+        nonlocal spool
+        try:
+            close()
+        finally:
+            if spool is not None:
+                try:
+                    archive.write_response(resp, spool, truncated=None if complete else "length")
+                except Exception as e:
+                    logger.error(f"WARC write failed for {resp.url}: {e}")
+                spool.close()
+                spool = None
+
+    resp.iter_content = tee
+    resp.close = close_and_archive
+
+
+def _timed_get(url: str, headers: dict, timeout: float | tuple) -> requests.Response:
+    """
+    GET through the shared session, attaching per-phase timings in seconds
+    as `resp.timings`: dns/connect/tls (zero on a reused keep-alive
+    connection), ttfb (request sent -> headers, connection setup excluded),
+    download (body) and total. Failures are recorded as error metrics.
+    """
+    start_phases()
+    start = time.perf_counter()
+    try:
+        resp = get_session().get(url, headers=headers, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        take_phases()
+        metrics.observe_error(url, e, time.perf_counter() - start)
+        raise
+    total = time.perf_counter() - start
+    phases = take_phases()
+    headers_at = resp.elapsed.total_seconds()
+    setup = sum(phases.get(p, 0.0) for p in ("dns", "connect", "tls"))
+    phases["ttfb"] = max(0.0, headers_at - setup)
+    phases["download"] = max(0.0, total - headers_at)
+    phases["total"] = total
+    resp.timings = phases
+    return resp
+
 
 # Fetch URL helper
 
-def fetch_url(url: str) -> requests.Response:
-    headers = {"User-Agent": "SmartCrawler/1.0"}
-    resp = requests.get(url, headers=headers, timeout=10)
+def fetch_url(url: str, timeout: float | tuple = DEFAULT_TIMEOUT) -> requests.Response:
+    resp = _get(url, timeout=timeout)
     resp.raise_for_status()
     return resp
 
+
+def fetch_stream(url: str, timeout: float | tuple = DEFAULT_TIMEOUT) -> requests.Response:
+    """
+    Rate-limited streaming GET (body not read yet, HTTP cache bypassed).
+    Use as a context manager so the connection goes back to the pool.
+    """
+    rate_limiter.acquire(url)
+    resp = get_session().get(url, timeout=timeout, stream=True)
+    _archive_streamed(resp)
+    try:
+        resp.raise_for_status()
+    except requests.exceptions.HTTPError:
+        resp.close()
+        raise
+    return resp
+
 # Robots summary
-def get_robots_summary() -> str:
-    text = fetch_url(rp.url).text
-    allowed, disallowed, sitemaps = [], [], []
-    crawl_delay = None
-    for line in text.splitlines():
-        l = line.strip().lower()
-        if l.startswith('allow:'):    allowed.append(line.split(':',1)[1].strip())
-        elif l.startswith('disallow:'): disallowed.append(line.split(':',1)[1].strip())
-        elif l.startswith('crawl-delay:'): crawl_delay = line.split(':',1)[1].strip()
-        elif l.startswith('sitemap:'):    sitemaps.append(line.split(':',1)[1].strip())
+def get_robots_summary(url: str = SITE_URL) -> str:
+    entry = robots_cache.get(url)
     return (
-        f"Allowed paths: {allowed}\n"
-        f"Disallowed paths: {disallowed}\n"
-        f"Crawl-delay: {crawl_delay}\n"
-        f"Sitemap links: {sitemaps}\n"
+        f"Allowed paths: {entry.allowed}\n"
+        f"Disallowed paths: {entry.disallowed}\n"
+        f"Crawl-delay: {entry.crawl_delay}\n"
+        f"Sitemap links: {entry.sitemaps}\n"
     )
 
 # Permission checker
-def can_crawl(url: str, user_agent: str = "SmartCrawler/1.0") -> bool:
-    return rp.can_fetch(user_agent, url)
+def can_crawl(url: str, user_agent: str = USER_AGENT) -> bool:
+    return robots_cache.get(url).parser.can_fetch(user_agent, url)
 
 # JS-heavy check
 
 def fetch_url_with_retries(url: str, retries: int = 3, backoff: float = 2.0) -> requests.Response:
-    headers = {"User-Agent": "SmartCrawler/1.0"}
     for attempt in range(1, retries+1):
         try:
-            return requests.get(url, headers=headers, timeout=10)
+            return _get(url)
         except requests.exceptions.RequestException as e:
             logger.warning(f"Fetch attempt {attempt} failed: {e}")
             if attempt < retries:
@@ -59,52 +299,135 @@ def fetch_url_with_retries(url: str, retries: int = 3, backoff: float = 2.0) ->
             else:
                 raise
 
-def is_javascript_heavy(url: str) -> bool:
+def visible_text_length(content: bytes | str) -> int:
+    """Length of the page's visible text (scripts, styles and comments excluded)."""
+    if not content or not content.strip():
+        return 0
+    try:
+        root = lxml.html.fromstring(content)
+    except etree.ParserError:
+        return 0
+    for el in root.xpath("//script | //style | //noscript | //template"):
+        el.drop_tree()
+    return sum(len(t.strip()) for t in root.itertext())
+
+
+def is_javascript_heavy(url: str, resp: requests.Response | None = None) -> bool:
+    """
+    True when the page has under 100 characters of visible text. Pass an
+    already fetched `resp` to skip the download.
+    """
     try:
-        resp = fetch_url_with_retries(url)
-        soup = BeautifulSoup(resp.text, "html.parser")
-        visible_text = soup.get_text(strip=True)
-        return len(visible_text) < 100
+        if resp is None:
+            resp = fetch_url_with_retries(url)
+        return visible_text_length(resp.content) < 100
     except Exception as e:
         logger.error(f"JS-heavy check failed after retries: {e}")
         return True
 
 
+FEED_PATHS = ["/feed", "/rss", "/feeds/posts/default", "/api"]
+
+
+def _probe_feed(u: str) -> bool:
+    """
+    HEAD the candidate and look at its Content-Type. Servers that refuse
+    HEAD get a streamed GET that is closed right after the headers arrive.
+    """
+    rate_limiter.acquire(u)
+    r = get_session().head(u, timeout=5, allow_redirects=True)
+    _archive(r)
+    ct = r.headers.get("Content-Type", "")
+    if r.status_code in (405, 501) or not ct:
+        rate_limiter.acquire(u)
+        g = get_session().get(u, timeout=5, stream=True)
+        _archive_streamed(g)
+        with g:
+            ct = g.headers.get("Content-Type", "")
+    return "xml" in ct or "json" in ct
+
+
 # RSS/API feeders check
 def check_rss_feeds(domain: str) -> list[str]:
-    candidates = ["/feed", "/rss", "/feeds/posts/default", "/api"]
+    candidates = [domain.rstrip("/") + path for path in FEED_PATHS]
     found = []
-    for path in candidates:
-        u = domain.rstrip("/") + path
-        try:
-            r = requests.get(u, timeout=5)
-            ct = r.headers.get("Content-Type","")
-            if "xml" in ct or "json" in ct:
-                found.append(u)
-        except:
-            continue
+    with ThreadPoolExecutor(max_workers=len(candidates), thread_name_prefix="feed-probe") as pool:
+        futures = {u: pool.submit(_probe_feed, u) for u in candidates}
+        for u, fut in futures.items():
+            try:
+                if fut.result():
+                    found.append(u)
+            except Exception:
+                continue
     return found
 
 # Playwright renderer
-def get_rendered_html_with_playwright(url: str) -> str:
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-        page.goto(url, timeout=15000)
-        time.sleep(3)
-        html = page.content()
-        browser.close()
+def get_rendered_html_with_playwright(url: str, block_policy: BlockPolicy | None = None) -> str:
+    """
+    Render `url` on the shared browser pool and return its HTML. Fonts,
+    media and trackers are skipped and images stubbed per `block_policy`
+    (defaults to browser_pool.BLOCK_POLICY; pass ALLOW_ALL to load everything).
+    """
+    def render(page) -> str:
+        blocker = ResourceBlocker(block_policy)
+        blocker.attach(page)
+        with Timer() as t:
+            with Timer() as goto:
+                page.goto(url, timeout=15000)
+            page.wait_for_timeout(3000)
+            html = page.content()
+        report = blocker.report()
+        logger.info(f"Rendered {url} in {t.seconds:.2f}s: {report}")
+        metrics.observe_render(
+            "html", url, t.seconds, goto=goto.seconds,
+            requests=report["requests"], bytes=report["bytes_downloaded"],
+        )
         return html
-def show_crawlability_report(url: str):
-    """Compute and render a crawlability score + recommendations."""
-    allowed    = can_crawl(url)
-    logger.info(allowed)
-    js_heavy   = is_javascript_heavy(url)
-    logger.info(js_heavy)
-    feeds      = check_rss_feeds(url)
-    logger.info(feeds)
-    has_feeds  = bool(feeds)
-    logger.info(has_feeds)
+    return get_browser_pool().run(render)
+
+
+def measure_render_savings(url: str, block_policy: BlockPolicy | None = None) -> dict:
+    """
+    Render `url` once with everything loaded and once with `block_policy`,
+    and report the bytes and seconds the policy saves.
+    """
+    def measure(policy):
+        def render(page):
+            blocker = ResourceBlocker(policy)
+            blocker.attach(page)
+            start = time.perf_counter()
+            page.goto(url, timeout=30000, wait_until="networkidle")
+            elapsed = time.perf_counter() - start
+            return {**blocker.report(), "seconds": round(elapsed, 3)}
+        return get_browser_pool().run(render)
+
+    baseline = measure(ALLOW_ALL)
+    blocked = measure(block_policy or BLOCK_POLICY)
+    return {
+        "baseline": baseline,
+        "blocked": blocked,
+        "bytes_saved": baseline["bytes_downloaded"] - blocked["bytes_downloaded"],
+        "seconds_saved": round(baseline["seconds"] - blocked["seconds"], 3),
+    }
+
+def crawlability_report(url: str) -> dict:
+    """
+    Compute a crawlability score + recommendations for `url`. The page is
+    fetched once and shared by the checks, which run concurrently.
+    """
+    with ThreadPoolExecutor(max_workers=3, thread_name_prefix="crawlability") as pool:
+        allowed_f = pool.submit(can_crawl, url)
+        feeds_f   = pool.submit(check_rss_feeds, url)
+        try:
+            resp = fetch_url_with_retries(url)
+        except Exception as e:
+            logger.error(f"Fetch for crawlability report failed: {e}")
+            resp = None
+        js_heavy  = is_javascript_heavy(url, resp) if resp is not None else True
+        allowed   = allowed_f.result()
+        feeds     = feeds_f.result()
+    has_feeds = bool(feeds)
+    logger.info(f"{url}: allowed={allowed} js_heavy={js_heavy} feeds={feeds}")
 
     # Score calculation
     score = 100
@@ -124,10 +447,30 @@ def show_crawlability_report(url: str):
     if has_feeds:
         tools.append("• You can also fetch RSS/API endpoints directly")
 
+    return {
+        "allowed": allowed,
+        "js_heavy": js_heavy,
+        "feeds": feeds,
+        "score": score,
+        "recommendations": tools,
+    }
+
+
+def analyze_urls(urls: list[str], max_workers: int = 4) -> dict[str, dict]:
+    """Crawlability reports for many URLs at once, keyed by URL."""
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analyze") as pool:
+        return dict(zip(urls, pool.map(crawlability_report, urls)))
+
+
+def show_crawlability_report(url: str, report: dict | None = None):
+    """Render a crawlability score + recommendations (computed unless `report` is given)."""
+    if report is None:
+        report = crawlability_report(url)
+
     # Render
     st.markdown("---")
     st.subheader("📊 Crawlability Report")
-    st.metric("Crawlability Score", f"{score}/100")
+    st.metric("Crawlability Score", f"{report['score']}/100")
     st.write("**Recommendations:**")
-    for rec in tools:
+    for rec in report["recommendations"]:
         st.write(rec)
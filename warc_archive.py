@@ -0,0 +1,296 @@
+# warc_archive.py
+
+import argparse
+import glob
+import logging
+import os
+import sys
+import threading
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import IO, Callable, Iterable, Iterator
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from warcio.archiveiterator import ArchiveIterator
+from warcio.statusandheaders import StatusAndHeaders
+from warcio.warcwriter import WARCWriter
+
+logger = logging.getLogger(__name__)
+
+SOFTWARE = "SmartCrawler/1.0"
+
+# Headers describing the wire encoding; the archived body is already decoded
+_WIRE_HEADERS = ("content-encoding", "transfer-encoding", "content-length")
+
+
+class WarcArchive:
+    """
+    Thread-safe writer of gzip-compressed WARC 1.1 files.
+
+    Each archived response becomes a "response" record (status line, headers
+    and body) preceded by the matching "request" record. Files are named
+    <prefix>-<UTC timestamp>-<serial>.warc.gz, start with a "warcinfo"
+    record, and roll over once they pass `max_bytes`.
+
+    requests hands over decoded bodies, so Content-Encoding,
+    Transfer-Encoding and Content-Length are kept as X-Archive-Orig-*
+    headers and a Content-Length matching the stored body is written.
+    """
+
+    def __init__(self, directory: str = "warc", prefix: str = "dream2000", max_bytes: int = 1024 ** 3):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = None
+        self._writer: WARCWriter | None = None
+        self._serial = 0
+        self.records = 0
+
+    @property
+    def path(self) -> str | None:
+        """File currently being written, if any."""
+        return self._file.name if self._file else None
+
+    def _open(self):
+        self._serial += 1
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+        name = f"{self.prefix}-{stamp}-{self._serial:05d}.warc.gz"
+        self._file = open(os.path.join(self.directory, name), "wb")
+        self._writer = WARCWriter(self._file, gzip=True, warc_version="1.1")
+        self._writer.write_record(self._writer.create_warcinfo_record(name, {
+            "software": SOFTWARE,
+            "format": "WARC File Format 1.1",
+        }))
+        logger.info(f"Writing WARC file {self._file.name}")
+
+    def write_response(
+        self,
+        resp: requests.Response,
+        body: bytes | IO[bytes] | None = None,
+        truncated: str | None = None,
+    ):
+        """
+        Append `resp` (and its request, when known) to the current file.
+
+        `body` replaces resp.content, e.g. with a file holding the copy of a
+        streamed body (positioned at its start). `truncated` sets the
+        WARC-Truncated reason ("length", ...) when only part of the body was
+        read.
+        """
+        if body is None:
+            body = resp.content or b""
+        if isinstance(body, bytes):
+            length, payload = len(body), _BytesReader(body)
+        else:
+            length, payload = body.seek(0, os.SEEK_END), body
+            body.seek(0)
+        version = getattr(resp.raw, "version", 11)
+        headers = []
+        for name, value in resp.headers.items():
+            if name.lower() in _WIRE_HEADERS:
+                name = f"X-Archive-Orig-{name}"
+            headers.append((name, value))
+        headers.append(("Content-Length", str(length)))
+        http_headers = StatusAndHeaders(
+            f"{resp.status_code} {resp.reason or ''}".strip(), headers,
+            protocol="HTTP/1.0" if version == 10 else "HTTP/1.1",
+        )
+        request = resp.request
+        with self._lock:
+            if self._file is None or self._file.tell() >= self.max_bytes:
+                self.close_file()
+                self._open()
+            record_id = f"<urn:uuid:{uuid.uuid4()}>"
+            warc_headers = {"WARC-Record-ID": record_id}
+            if truncated:
+                warc_headers["WARC-Truncated"] = truncated
+            response = self._writer.create_warc_record(
+                resp.url, "response",
+                payload=payload,
+                length=length,
+                http_headers=http_headers,
+                warc_headers_dict=warc_headers,
+            )
+            self._writer.write_record(response)
+            if request is not None:
+                parsed = urlparse(request.url)
+                target = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+                req_headers = StatusAndHeaders(
+                    f"{request.method} {target or '/'} HTTP/1.1",
+                    [("Host", parsed.netloc), *request.headers.items()],
+                    is_http_request=True,
+                )
+                self._writer.write_record(self._writer.create_warc_record(
+                    request.url, "request",
+                    http_headers=req_headers,
+                    warc_headers_dict={"WARC-Concurrent-To": record_id},
+                ))
+            self._file.flush()
+            self.records += 1
+
+    def close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+    def close(self):
+        with self._lock:
+            self.close_file()
+
+
+class _BytesReader:
+    """Minimal readable stream over a bytes object for warcio payloads."""
+
+    def __init__(self, data: bytes):
+        self._data = data
+        self._pos = 0
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._data) if size is None or size < 0 else self._pos + size
+        chunk = self._data[self._pos:end]
+        self._pos += len(chunk)
+        return chunk
+
+
+def archive_files(paths: Iterable[str] | str) -> list[str]:
+    """Expand directories and glob patterns into a sorted list of .warc(.gz) files."""
+    if isinstance(paths, str):
+        paths = [paths]
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += glob.glob(os.path.join(path, "*.warc.gz")) + glob.glob(os.path.join(path, "*.warc"))
+        else:
+            files += glob.glob(path)
+    return sorted(set(files))
+
+
+def iter_responses(paths: Iterable[str] | str) -> Iterator[dict]:
+    """
+    Stream the response records of WARC files as dicts with url, status,
+    headers (list of pairs), content (bytes) and date.
+    """
+    for path in archive_files(paths):
+        with open(path, "rb") as f:
+            for record in ArchiveIterator(f):
+                if record.rec_type != "response" or record.http_headers is None:
+                    continue
+                yield {
+                    "url": record.rec_headers.get_header("WARC-Target-URI"),
+                    "status": int(record.http_headers.get_statuscode() or 0),
+                    "headers": record.http_headers.headers,
+                    "content": record.content_stream().read(),
+                    "date": record.rec_headers.get_header("WARC-Date"),
+                }
+
+
+def is_listing_url(url: str) -> bool:
+    """Category listing pages are the ones the paginator requested with ?p=N."""
+    return "p" in parse_qs(urlparse(url).query)
+
+
+def is_html(response: dict) -> bool:
+    content_type = dict((k.lower(), v) for k, v in response["headers"]).get("content-type", "")
+    return response["status"] == 200 and "html" in content_type
+
+
+def _parse_batch(kind: str, batch: list[tuple[str, bytes]]) -> list[tuple[str, object]]:
+    # runs in a worker process: import the parsers there
+    from data_fetch import parse_product_detail, parse_products
+
+    results = []
+    for url, content in batch:
+        try:
+            if kind == "listing":
+                results.append((url, parse_products(content, url)))
+            else:
+                results.append((url, parse_product_detail(content, url)))
+        except Exception as e:
+            logger.warning(f"Re-parse failed for {url}: {e}")
+    return results
+
+
+def reparse_archive(
+    paths: Iterable[str] | str,
+    kind: str = "listing",
+    url_filter: Callable[[str], bool] | None = None,
+    processes: int | None = None,
+    batch_size: int = 16,
+) -> Iterator[tuple[str, object]]:
+    """
+    Re-run extraction over archived responses on a process pool, with no
+    network access. Yields (url, result) in completion order, where the
+    result is the parse_products() list for kind="listing" or the
+    parse_product_detail() dict for kind="detail".
+
+    Args:
+        paths: WARC files, directories or glob patterns.
+        kind: "listing" or "detail".
+        url_filter: Which archived 200 HTML responses to parse; defaults to
+            is_listing_url for listings and everything else for details.
+        processes: Worker processes (defaults to one per core).
+        batch_size: Pages sent to a worker at a time.
+
+    The archive is read and decompressed in this process while the workers
+    parse; at most 2 x processes batches are queued at a time.
+    """
+    if kind not in ("listing", "detail"):
+        raise ValueError(f"Unknown kind {kind!r}")
+    if url_filter is None:
+        url_filter = is_listing_url if kind == "listing" else (lambda url: not is_listing_url(url))
+    processes = processes or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        pending = set()
+        batch: list[tuple[str, bytes]] = []
+
+        def drain(limit: int):
+            nonlocal pending
+            while len(pending) > limit:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    yield from fut.result()
+
+        for response in iter_responses(paths):
+            if not is_html(response) or not url_filter(response["url"]):
+                continue
+            batch.append((response["url"], response["content"]))
+            if len(batch) >= batch_size:
+                pending.add(pool.submit(_parse_batch, kind, batch))
+                batch = []
+                yield from drain(processes * 2)
+        if batch:
+            pending.add(pool.submit(_parse_batch, kind, batch))
+        yield from drain(0)
+
+
+def main(argv: list[str] | None = None) -> int:
+    from exports import write_jsonl
+
+    parser = argparse.ArgumentParser(description="Re-extract products from archived WARC responses.")
+    parser.add_argument("paths", nargs="+", help="WARC files, directories or glob patterns")
+    parser.add_argument("--kind", choices=("listing", "detail"), default="listing")
+    parser.add_argument("--out", default="reparsed.jsonl", help="JSON Lines output file")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    def rows():
+        for url, result in reparse_archive(args.paths, args.kind, processes=args.processes):
+            if args.kind == "listing":
+                for product in result:
+                    yield {**product, "page_url": url}
+            else:
+                yield result
+
+    count = write_jsonl(rows(), args.out)
+    logger.info(f"Wrote {count} records to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())